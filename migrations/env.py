@@ -0,0 +1,50 @@
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from src.core.postgres.bot.engine import engine
+from src.core.postgres.wrapper import Base
+# noinspection PyUnresolvedReferences
+import src.core.postgres.bot
+
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name)
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=Base.metadata,
+        literal_binds=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    # A separate engine, so the bot's statement timeout does not cut index builds
+    migration_engine = create_async_engine(
+        engine.url,
+        poolclass=NullPool
+    )
+    async with migration_engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await migration_engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
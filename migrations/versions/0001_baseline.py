@@ -0,0 +1,59 @@
+"""Baseline schema as created by create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-09-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def common_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True, unique=True, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP, nullable=False)
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "account",
+        *common_columns(),
+        sa.Column("type", sa.Text, nullable=False),
+        sa.Column("is_active", sa.Boolean, nullable=False),
+        sa.Column("chat_id", sa.BigInteger, unique=True, nullable=False),
+        sa.Column("handle", sa.Text, nullable=True),
+        sa.Column("full_name", sa.Text, nullable=False),
+        sa.Column("description", sa.Text, nullable=True),
+        sa.Column("image", sa.LargeBinary, nullable=True)
+    )
+    op.create_table(
+        "tag",
+        *common_columns(),
+        sa.Column("title", sa.Text, nullable=False)
+    )
+    op.create_table(
+        "like",
+        *common_columns(),
+        sa.Column("liker_account_id", sa.Integer, sa.ForeignKey("account.id"), nullable=False),
+        sa.Column("liked_account_id", sa.Integer, sa.ForeignKey("account.id"), nullable=False)
+    )
+    op.create_table(
+        "accounttag",
+        *common_columns(),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("account.id")),
+        sa.Column("tag_id", sa.Integer, sa.ForeignKey("tag.id"))
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("accounttag")
+    op.drop_table("like")
+    op.drop_table("tag")
+    op.drop_table("account")
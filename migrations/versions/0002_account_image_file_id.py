@@ -0,0 +1,27 @@
+"""Keep Telegram file ids and content hashes of account images
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-09-01 00:00:00
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases patched by hand before migrations existed already have them
+    op.execute(
+        "ALTER TABLE account "
+        "ADD COLUMN IF NOT EXISTS image_file_id TEXT, "
+        "ADD COLUMN IF NOT EXISTS image_hash TEXT"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("account", "image_hash")
+    op.drop_column("account", "image_file_id")
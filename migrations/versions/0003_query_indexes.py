@@ -0,0 +1,56 @@
+"""Unique pairs and indexes for the feed, like and tag queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-09-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def add_unique_pair(
+    table: str,
+    name: str,
+    left: str,
+    right: str
+) -> None:
+    # Keep the oldest of duplicate rows left by concurrent clicks
+    op.execute(
+        f'DELETE FROM "{table}" AS l USING "{table}" AS o '
+        f"WHERE l.{left} = o.{left} AND l.{right} = o.{right} AND l.id > o.id"
+    )
+    op.execute(
+        f'ALTER TABLE "{table}" DROP CONSTRAINT IF EXISTS {name}'
+    )
+    op.create_unique_constraint(name, table, [left, right])
+
+
+def upgrade() -> None:
+    add_unique_pair("like", "uq_like_liker_liked", "liker_account_id", "liked_account_id")
+    add_unique_pair("accounttag", "uq_accounttag_account_tag", "account_id", "tag_id")
+    # Reverse lookups: who liked an account, which accounts hold a tag
+    op.create_index("ix_like_liked_liker", "like", ["liked_account_id", "liker_account_id"])
+    op.create_index("ix_accounttag_tag_account", "accounttag", ["tag_id", "account_id"])
+    op.create_index("ix_account_type_is_active", "account", ["type", "is_active"])
+    # The students' feed scans active mentors only
+    op.create_index(
+        "ix_account_active_mentor",
+        "account",
+        ["id"],
+        postgresql_where=sa.text("type = 'mentor' AND is_active")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_account_active_mentor", "account")
+    op.drop_index("ix_account_type_is_active", "account")
+    op.drop_index("ix_accounttag_tag_account", "accounttag")
+    op.drop_index("ix_like_liked_liker", "like")
+    op.drop_constraint("uq_accounttag_account_tag", "accounttag")
+    op.drop_constraint("uq_like_liker_liked", "like")
@@ -0,0 +1,31 @@
+"""Keep the Telegram file_unique_id of account images in its own column
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-09-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "account",
+        sa.Column("image_file_unique_id", sa.Text(), nullable=True)
+    )
+    # Rows written without a blob store hold a file_unique_id instead of a digest
+    op.execute(
+        "UPDATE account "
+        "SET image_file_unique_id = image_hash, image_hash = NULL "
+        "WHERE image_hash IS NOT NULL AND image_hash !~ '^[0-9a-f]{64}$'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("account", "image_file_unique_id")
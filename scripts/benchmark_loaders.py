@@ -0,0 +1,111 @@
+import asyncio
+import time
+from sqlalchemy import event, func, select
+from src.core.postgres.bot.engine import engine, open_db_session
+from src.core.postgres.wrapper import DbWrapper
+import src.core.postgres.bot as tb
+
+
+# The graph toggle_account_like used to load for the liker
+JOINED = (
+    (
+        tb.Account.likes,
+        tb.Like.liker_account,
+        tb.Account.account_tags,
+        tb.AccountTag.tag
+    ),
+    (
+        tb.Account.liked_by,
+        tb.Like.liker_account,
+        tb.Account.account_tags,
+        tb.AccountTag.tag
+    ),
+    (
+        tb.Account.account_tags,
+        tb.AccountTag.tag
+    )
+)
+# The same graph with collections loaded by separate IN queries
+SELECTIN = (
+    (
+        "selectin",
+        tb.Account.likes,
+        "joined",
+        tb.Like.liker_account,
+        "selectin",
+        tb.Account.account_tags,
+        "joined",
+        tb.AccountTag.tag
+    ),
+    (
+        "selectin",
+        tb.Account.liked_by,
+        "joined",
+        tb.Like.liker_account,
+        "selectin",
+        tb.Account.account_tags,
+        "joined",
+        tb.AccountTag.tag
+    ),
+    (
+        "selectin",
+        tb.Account.account_tags,
+        "joined",
+        tb.AccountTag.tag
+    )
+)
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.statements: int = 0
+        self.rows: int = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements += 1
+        self.rows += max(cursor.rowcount, 0)
+
+
+async def measure(
+    account_ids: list[int],
+    join: tuple
+) -> tuple[Counter, float]:
+    counter = Counter()
+    event.listen(engine.sync_engine, "after_cursor_execute", counter)
+    started = time.perf_counter()
+    try:
+        for account_id in account_ids:
+            async with open_db_session() as session:
+                (
+                    await DbWrapper(session).scalars(
+                        tb.Account,
+                        tb.Account.id == account_id,
+                        join=join
+                    )
+                ).unique().one()
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", counter)
+    return counter, time.perf_counter() - started
+
+
+async def main():
+    async with open_db_session() as session:
+        # The most liked accounts suffer the worst row explosion
+        account_ids = (
+            await session.scalars(
+                select(tb.Like.liked_account_id)
+                .group_by(tb.Like.liked_account_id)
+                .order_by(func.count().desc())
+                .limit(20)
+            )
+        ).all()
+    for name, join in (("joined", JOINED), ("selectin", SELECTIN)):
+        counter, elapsed = await measure(account_ids, join)
+        print(
+            f"{name:>8}: accounts={len(account_ids)} statements={counter.statements} "
+            f"rows={counter.rows} elapsed={elapsed:.3f}s"
+        )
+    await engine.dispose()
+
+
+asyncio.run(main())
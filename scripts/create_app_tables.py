@@ -1,12 +1,5 @@
-import asyncio
-from src.core.postgres.bot.engine import engine
-from src.core.postgres.wrapper import Base
+from alembic import command
+from alembic.config import Config
 
 
-async def create_all():
-    async with engine.begin() as session:
-        # noinspection PyUnresolvedReferences
-        await session.run_sync(Base.metadata.create_all)
-
-
-asyncio.run(create_all())
+command.upgrade(Config("alembic.ini"), "head")
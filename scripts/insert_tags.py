@@ -1,4 +1,6 @@
 import asyncio
+from redis.asyncio import Redis
+from src.core.config import settings
 from src.core.postgres.bot.engine import open_db_session
 import src.core.postgres.bot.models as tb
 
@@ -15,5 +17,14 @@ async def main():
             session.add(tb.Tag(title=tag))
         await session.commit()
 
+    # Drop the tag catalogue cached by running bot instances
+    redis = Redis(
+        host=settings.redis.host,
+        port=settings.redis.port,
+        db=settings.redis.database
+    )
+    await redis.publish("tags:invalidate", "")
+    await redis.aclose()
+
 
 asyncio.run(main())
@@ -0,0 +1,46 @@
+import asyncio
+import hashlib
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
+from src.core.blob import blob_store
+from src.core.config import settings
+from src.core.postgres.bot.engine import open_db_session
+import src.core.postgres.bot as tb
+
+
+async def main():
+    # Upload legacy images once and keep only their file_id and hash
+    bot = Bot(token=settings.bot.token)
+    async with open_db_session() as session:
+        account_ids = (
+            await session.scalars(
+                select(tb.Account.id).where(
+                    tb.Account.image.is_not(None)
+                )
+            )
+        ).all()
+        for account_id in account_ids:
+            account = await session.get(
+                tb.Account,
+                account_id,
+                options=(undefer(tb.Account.image),)
+            )
+            message = await bot.send_photo(
+                settings.bot.media_chat_id,
+                BufferedInputFile(account.image, "image"),
+                disable_notification=True
+            )
+            account.image_file_id = message.photo[-1].file_id
+            account.image_file_unique_id = message.photo[-1].file_unique_id
+            if blob_store is not None:
+                account.image_hash = blob_store.put(account.image)
+            else:
+                account.image_hash = hashlib.sha256(account.image).hexdigest()
+            account.image = None
+            await session.commit()
+    await bot.session.close()
+
+
+asyncio.run(main())
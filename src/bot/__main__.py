@@ -1,35 +1,128 @@
 import asyncio
+import logging
+import signal
 from aiogram.utils.i18n.middleware import FSMI18nMiddleware
 import src.bot.logic as l
+import src.bot.markup.inline as kb
 from src.bot.logic.middlewares import (
     MenuVerifierMiddleware, DbAdapterMiddleware,
-    StateDataGetterMiddleware
+    ContextMiddleware, UpdatePublisherMiddleware
 )
 from src.bot.logic.utils import i18n
-from src.core.postgres.bot.engine import open_db_session
+from src.bot.webhook import run_webhook
+from src.bot.stream import UpdateStream
+from src.bot.logic.ratelimit import report_queue_depth
+from src.bot.logic.catalogue import TAGS_CHANNEL, tag_catalogue
+from src.bot.logic.snapshots import ACCOUNTS_CHANNEL, account_snapshots
+from src.core.config import settings
+from src.core.postgres.bot.engine import open_db_session, ping, report_pool_usage
+from src.core.postgres.wrapper import DbWrapper
+
+
+def stream_from_settings() -> UpdateStream:
+    return UpdateStream(
+        settings.nats.url,
+        settings.nats.stream,
+        settings.nats.subject,
+        settings.nats.partitions,
+        settings.nats.ack_wait
+    )
+
+
+async def receive_updates(
+    handle_as_tasks: bool = True
+) -> None:
+    match settings.get("runner.mode", "polling"):
+        case "webhook":
+            await run_webhook(
+                l.dispatcher,
+                l.bot,
+                (l.storage.redis.ping, ping)
+            )
+        case _:
+            await l.dispatcher.start_polling(
+                l.bot,
+                handle_as_tasks=handle_as_tasks
+            )
 
 
 async def main() -> None:
 
-    l.command_router.message.middleware(FSMI18nMiddleware(i18n))
-    l.command_router.message.middleware(DbAdapterMiddleware(open_db_session))
+    if settings.get("runner.role", "standalone") != "ingress":
+        l.dispatcher.update.outer_middleware(
+            ContextMiddleware(
+                l.storage,
+                l.dispatcher.fsm.events_isolation,
+                FSMI18nMiddleware(i18n)
+            )
+        )
+    l.command_router.message.middleware(DbAdapterMiddleware(open_db_session, l.storage.redis))
 
-    l.menu_router.my_chat_member.middleware(StateDataGetterMiddleware())
-    l.menu_router.my_chat_member.middleware(DbAdapterMiddleware(open_db_session))
-    l.menu_router.callback_query.middleware(StateDataGetterMiddleware())
-    l.menu_router.callback_query.middleware(FSMI18nMiddleware(i18n))
+    l.menu_router.my_chat_member.middleware(DbAdapterMiddleware(open_db_session, l.storage.redis))
     l.menu_router.callback_query.middleware(MenuVerifierMiddleware())
-    l.menu_router.callback_query.middleware(DbAdapterMiddleware(open_db_session))
-    l.menu_router.message.middleware(StateDataGetterMiddleware())
-    l.menu_router.message.middleware(FSMI18nMiddleware(i18n))
-    l.menu_router.message.middleware(DbAdapterMiddleware(open_db_session))
+    l.menu_router.callback_query.middleware(DbAdapterMiddleware(open_db_session, l.storage.redis))
+    l.menu_router.message.middleware(DbAdapterMiddleware(open_db_session, l.storage.redis))
 
     l.dispatcher.include_routers(
         l.command_router,
         l.menu_router,
         l.simple_router
     )
-    await l.dispatcher.start_polling(l.bot)
+    await l.storage.migrate()
+    await l.media.load()
+    kb.warm_up(i18n)
+    async with open_db_session() as session:
+        await tag_catalogue.load(DbWrapper(session))
+    l.invalidator.register(TAGS_CHANNEL, tag_catalogue.invalidate)
+    l.invalidator.register(ACCOUNTS_CHANNEL, account_snapshots.invalidate)
+    tasks: list[asyncio.Task] = [
+        asyncio.create_task(l.invalidator.run())
+    ]
+    if settings.get("postgres_pool.report_interval"):
+        tasks.append(
+            asyncio.create_task(
+                report_pool_usage(settings.postgres_pool.report_interval)
+            )
+        )
+    if settings.get("rate_limit.report_interval"):
+        tasks.append(
+            asyncio.create_task(
+                report_queue_depth(l.rate_limiter, settings.rate_limit.report_interval)
+            )
+        )
+    if settings.get("runner.role", "standalone") != "ingress":
+        tasks.append(
+            asyncio.create_task(l.notifier.run(i18n))
+        )
+        tasks.append(
+            asyncio.create_task(l.presence.run())
+        )
+
+    match settings.get("runner.role", "standalone"):
+        case "ingress":
+            update_stream = stream_from_settings()
+            await update_stream.connect()
+            l.dispatcher.update.outer_middleware(
+                UpdatePublisherMiddleware(update_stream)
+            )
+            await receive_updates(handle_as_tasks=False)
+            await update_stream.close()
+        case "worker":
+            update_stream = stream_from_settings()
+            await update_stream.connect()
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, stop.set)
+            await update_stream.consume(l.dispatcher, l.bot, stop)
+            await update_stream.close()
+            await l.bot.session.close()
+        case _:
+            await receive_updates()
+    for task in tasks:
+        task.cancel()
+    await l.presence.flush()
 
 
+logging.basicConfig(level=logging.INFO)
 asyncio.run(main())
\ No newline at end of file
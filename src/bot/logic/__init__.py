@@ -1,4 +1,4 @@
-from src.bot.logic.entities import bot, dispatcher
+from src.bot.logic.entities import bot, dispatcher, storage, media, invalidator, notifier, rate_limiter, presence
 from src.bot.logic.handlers.account import menu_router
 from src.bot.logic.handlers.command import command_router
 from src.bot.logic.handlers.misc import menu_router, simple_router
@@ -1,10 +1,19 @@
-from typing import Iterable
+from typing import Any
 from dataclasses import dataclass
 
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.i18n import I18n
+from redis.asyncio import Redis
+from sqlalchemy import CTE, delete, exists, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.postgres.wrapper import DbWrapper
+from src.core.postgres.wrapper import Base, DbWrapper
+from src.bot.logic.feed import Feed, FeedWindow
+from src.bot.logic.ranking import ranking
+from src.bot.logic.cards import CardCache, ProfileCard
+from src.bot.logic.snapshots import ACCOUNTS_CHANNEL, AccountSnapshot, account_snapshots
+from src.bot.logic.catalogue import TagEntry, tag_catalogue
 import src.bot.text.account as txt
 import src.bot.markup.inline as kb
 import src.core.postgres.bot as tb
@@ -14,10 +23,170 @@ import src.core.postgres.bot as tb
 class ResponseData:
     text: str
     markup: InlineKeyboardMarkup
-    file: bytes | None = None
+    file: str | None = None
+    entry_data: dict[str, Any] | None = None
+
+
+@dataclass
+class LikeToggle:
+    is_liked: bool
+    # False when a concurrent click inserted the same like first
+    is_created: bool
+    is_mutual: bool
+
+
+@dataclass
+class TagToggle:
+    is_added: bool
+    # False when a concurrent click made the same change first
+    is_changed: bool
+
+
+def toggle_ctes(
+    model: type[Base],
+    constraint: str,
+    values: dict[str, Any]
+) -> tuple[CTE, CTE]:
+    """Builds a DELETE of the row and an INSERT of it that runs only if nothing was deleted."""
+    deleted = (
+        delete(model)
+        .where(
+            *(getattr(model, k) == v for k, v in values.items())
+        )
+        .returning(model.id)
+        .cte("deleted")
+    )
+    inserted = (
+        insert(model)
+        .from_select(
+            (
+                *(getattr(model, k) for k in values),
+                model.created_at
+            ),
+            select(
+                *(literal(v) for v in values.values()),
+                func.now()
+            ).where(
+                ~exists(select(deleted.c.id))
+            )
+        )
+        .on_conflict_do_nothing(
+            constraint=constraint
+        )
+        .returning(model.id)
+        .cte("inserted")
+    )
+    return deleted, inserted
 
 
 class DbAdapter(DbWrapper):
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis
+    ):
+        super().__init__(session)
+        self.redis: Redis = redis
+        self.feed = Feed(redis, self)
+        self.cards = CardCache(redis)
+        self.changed_cards: set[int] = set()
+        self.changed_accounts: set[int] = set()
+
+    def card_changed(
+        self,
+        account_id: int
+    ) -> None:
+        """Drops the account's cached card once the transaction commits."""
+        self.changed_cards.add(account_id)
+
+    def account_changed(
+        self,
+        chat_id: int
+    ) -> None:
+        """Drops the account's snapshot in every process once the transaction commits."""
+        self.changed_accounts.add(chat_id)
+
+    async def commit(self) -> None:
+        await super().commit()
+        await self.feed.apply()
+        while self.changed_cards:
+            await self.cards.invalidate(self.changed_cards.pop())
+        while self.changed_accounts:
+            chat_id: int = self.changed_accounts.pop()
+            account_snapshots.invalidate(chat_id)
+            await self.redis.publish(ACCOUNTS_CHANNEL, chat_id)
+
+    async def activate(
+        self,
+        chat_id: int,
+        handle: str | None
+    ) -> None:
+        """Reactivates the account right away, since other feeds depend on it."""
+        account = (
+            await self.session.execute(
+                update(tb.Account)
+                .where(
+                    tb.Account.chat_id == chat_id
+                )
+                .values(
+                    is_active=True,
+                    handle=handle
+                )
+                .returning(
+                    tb.Account.id,
+                    tb.Account.type,
+                    tb.Account.is_active
+                )
+            )
+        ).one()
+        await self.feed.account_changed(account)
+        self.account_changed(chat_id)
+
+    async def snapshot(
+        self,
+        chat_id: int
+    ) -> AccountSnapshot:
+        snapshot: AccountSnapshot | None = account_snapshots.get(chat_id)
+        if snapshot is not None:
+            return snapshot
+        generation: int = account_snapshots.generation
+        row = (
+            await self.session.execute(
+                select(
+                    tb.Account.id,
+                    tb.Account.chat_id,
+                    tb.Account.type,
+                    tb.Account.is_active,
+                    tb.Account.handle,
+                    tb.Account.full_name,
+                    select(
+                        func.array_agg(tb.AccountTag.tag_id)
+                    ).where(
+                        tb.AccountTag.account_id == tb.Account.id
+                    ).scalar_subquery().label("tag_ids"),
+                    select(
+                        func.array_agg(tb.Like.liked_account_id)
+                    ).where(
+                        tb.Like.liker_account_id == tb.Account.id
+                    ).scalar_subquery().label("liked_ids")
+                ).where(
+                    tb.Account.chat_id == chat_id
+                )
+            )
+        ).one()
+        snapshot = AccountSnapshot(
+            row.id,
+            row.chat_id,
+            row.type,
+            row.is_active,
+            row.handle,
+            row.full_name,
+            frozenset(row.tag_ids or ()),
+            frozenset(row.liked_ids or ())
+        )
+        account_snapshots.put(snapshot, generation)
+        return snapshot
+
     # noinspection PyMethodMayBeStatic
     async def main_menu_response(
         self,
@@ -35,6 +204,64 @@ class DbAdapter(DbWrapper):
             )
         )
 
+    async def toggle_like(
+        self,
+        liker_account_id: int,
+        liked_account_id: int
+    ) -> LikeToggle:
+        """Deletes the like if it exists, inserts it otherwise, in one statement."""
+        deleted, inserted = toggle_ctes(
+            tb.Like,
+            "uq_like_liker_liked",
+            {
+                "liker_account_id": liker_account_id,
+                "liked_account_id": liked_account_id
+            }
+        )
+        row = (
+            await self.session.execute(
+                select(
+                    ~exists(select(deleted.c.id)),
+                    exists(select(inserted.c.id)),
+                    exists().where(
+                        tb.Like.liker_account_id == liked_account_id,
+                        tb.Like.liked_account_id == liker_account_id
+                    )
+                )
+            )
+        ).one()
+        return LikeToggle(*row)
+
+    async def toggle_tag(
+        self,
+        account_id: int,
+        tag_id: int
+    ) -> TagToggle:
+        """Deletes the account tag if it exists, inserts it otherwise, in one statement."""
+        deleted, inserted = toggle_ctes(
+            tb.AccountTag,
+            "uq_accounttag_account_tag",
+            {
+                "account_id": account_id,
+                "tag_id": tag_id
+            }
+        )
+        row = (
+            await self.session.execute(
+                select(
+                    ~exists(select(deleted.c.id)),
+                    or_(
+                        exists(select(deleted.c.id)),
+                        exists(select(inserted.c.id))
+                    )
+                )
+            )
+        ).one()
+        return TagToggle(*row)
+
+    async def tags(self) -> tuple[TagEntry, ...]:
+        return await tag_catalogue.get(self)
+
     async def account_menu_response(
         self,
         account_chat_id: int | tb.Account,
@@ -51,9 +278,14 @@ class DbAdapter(DbWrapper):
                     tb.Account.chat_id == account_chat_id,
                     join=(
                         (
+                            "selectin",
                             tb.Account.account_tags,
+                            "joined",
                             tb.AccountTag.tag
                         ),
+                    ),
+                    undefer=(
+                        tb.Account.description,
                     )
                 )
             ).unique().one()
@@ -65,132 +297,107 @@ class DbAdapter(DbWrapper):
                 i18n,
                 locale
             ),
-            account.image
+            account.image_file_id
         )
 
-    async def account_list_response(
+    async def card(
         self,
-        account_chat_id: int | tb.Account,
-        page: int,
-        i18n: I18n,
-        locale: str
-    ) -> ResponseData:
-        accounts: Iterable[tb.Account] = []
-        account: tb.Account
-        if isinstance(account_chat_id, tb.Account):
-            account = account_chat_id
-        else:
-            account = (
+        account_id: int
+    ) -> ProfileCard:
+        """Reads the account's profile card through the card cache."""
+        version, card = await self.cards.get(account_id)
+        if card is None:
+            account: tb.Account = (
                 await self.scalars(
                     tb.Account,
-                    tb.Account.chat_id == account_chat_id,
+                    tb.Account.id == account_id,
                     join=(
                         (
-                            tb.Account.likes,
-                            tb.Like.liker_account,
+                            "selectin",
                             tb.Account.account_tags,
+                            "joined",
                             tb.AccountTag.tag
                         ),
-                        (
-                            tb.Account.liked_by,
-                            tb.Like.liker_account,
-                            tb.Account.account_tags,
-                            tb.AccountTag.tag
-                        ),
-                        (
-                            tb.Account.account_tags,
-                            tb.AccountTag.tag
-                        )
+                    ),
+                    load_only=(
+                        tb.Account.id,
+                        tb.Account.full_name,
+                        tb.Account.description,
+                        tb.Account.image_file_id
                     )
                 )
             ).unique().one()
-        match account.type:
-            case "mentor":
-                accounts = [
-                    l.liker_account for l in account.liked_by
-                    if l.liker_account.is_active
-                    and l.liker_account.type == "student"
-                ]
-            case "student":
-                accounts = (
-                    await self.scalars(
-                        tb.Account,
-                        tb.Account.type == "mentor",
-                        tb.Account.is_active == True,
-                        join=(
-                            (
-                                tb.Account.liked_by,
-                            ),
-                            (
-                                tb.Account.account_tags,
-                                tb.AccountTag.tag
-                            ),
-                        )
-                    )
-                ).unique().all()
-
-        # Sort by relevance
-        sorting_table: list[tuple[tb.Account, int]] = []
-        for t in accounts:
-            c = 0
-            for tag_id in [at.tag.id for at in account.account_tags]:
-                if tag_id in [at.tag.id for at in t.account_tags]:
-                    c += 1
-            sorting_table.append((t, c))
-        sorting_table.sort(key=lambda x: x[1], reverse=True)
-        accounts = [i[0] for i in sorting_table]
-
-        target_account: tb.Account = accounts[page]
-        text = txt.account_menu(
-            target_account
+            card = ProfileCard(
+                txt.account_menu(
+                    account
+                ),
+                account.image_file_id
+            )
+            await self.cards.put(account_id, version, card)
+        return card
+
+    async def account_list_response(
+        self,
+        account_chat_id: int | AccountSnapshot,
+        direction: str,
+        score: int,
+        entry_id: int,
+        i18n: I18n,
+        locale: str
+    ) -> ResponseData:
+        account: AccountSnapshot
+        if isinstance(account_chat_id, AccountSnapshot):
+            account = account_chat_id
+        else:
+            account = await self.snapshot(account_chat_id)
+
+        window: FeedWindow = await self.feed.window(
+            account,
+            direction,
+            None if direction == "first" else ranking.rank(score, entry_id)
         )
+        target_account_id: int = window.account_id
+        score = ranking.score_of(window.rank, target_account_id)
+        card: ProfileCard = await self.card(target_account_id)
+        is_liked: bool = target_account_id in account.liked_ids
+
         return ResponseData(
-            text,
+            card.text,
             kb.account_list(
-                account,
-                accounts,
-                page,
+                target_account_id,
+                is_liked,
+                score,
+                window.has_prev,
+                window.has_next,
                 i18n,
                 locale
             ),
-            target_account.image
+            card.file,
+            {
+                "score": score,
+                "entry_id": target_account_id
+            }
         )
 
     async def account_tag_list_response(
         self,
-        account_chat_id: int | tb.Account,
+        account_chat_id: int | AccountSnapshot,
         i18n: I18n,
         locale: str
     ) -> ResponseData:
-        account: tb.Account
-        if isinstance(account_chat_id, tb.Account):
+        account: AccountSnapshot
+        if isinstance(account_chat_id, AccountSnapshot):
             account = account_chat_id
         else:
-            account = (
-                await self.scalars(
-                    tb.Account,
-                    tb.Account.chat_id == account_chat_id,
-                    join=(
-                        (
-                            tb.Account.account_tags,
-                            tb.AccountTag.tag
-                        ),
-                    )
-                )
-            ).unique().one()
-        tags: Iterable[tb.Tag] = (
-            await self.scalars(
-                tb.Tag
-            )
-        ).all()
+            account = await self.snapshot(account_chat_id)
         return ResponseData(
             i18n.gettext(
                 "account_tag_list.text",
                 locale=locale
             ),
             kb.account_tag_list(
-                tags,
-                account.account_tags,
+                await self.tags(),
+                account.tag_ids,
                 i18n,
                 locale
             )
@@ -0,0 +1,63 @@
+import json
+from dataclasses import asdict, dataclass
+from redis.asyncio import Redis
+from src.core.config import settings
+
+
+GET_CARD = """
+local version = redis.call("GET", KEYS[1]) or "0"
+return {version, redis.call("GET", KEYS[1] .. ":" .. version)}
+"""
+
+
+@dataclass(frozen=True)
+class ProfileCard:
+    text: str
+    file: str | None
+
+
+class CardCache:
+    """Rendered profile cards in Redis, keyed by account id and version."""
+
+    def __init__(
+        self,
+        redis: Redis
+    ) -> None:
+        self.redis: Redis = redis
+        self.ttl: int = settings.get("cards.ttl", 3600)
+        self.get_card = redis.register_script(GET_CARD)
+
+    @staticmethod
+    def key(
+        account_id: int
+    ) -> str:
+        return f"card:{account_id}"
+
+    async def get(
+        self,
+        account_id: int
+    ) -> tuple[int, ProfileCard | None]:
+        """Returns the current version and the card cached for it."""
+        version, raw = await self.get_card(keys=[self.key(account_id)])
+        if raw is None:
+            return int(version), None
+        return int(version), ProfileCard(**json.loads(raw))
+
+    async def put(
+        self,
+        account_id: int,
+        version: int,
+        card: ProfileCard
+    ) -> None:
+        await self.redis.set(
+            f"{self.key(account_id)}:{version}",
+            json.dumps(asdict(card)),
+            ex=self.ttl
+        )
+
+    async def invalidate(
+        self,
+        account_id: int
+    ) -> None:
+        # Cards rendered from older data are stored under older versions
+        await self.redis.incr(self.key(account_id))
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from sqlalchemy import select
+from src.core.config import settings
+from src.core.postgres.wrapper import DbWrapper
+import src.core.postgres.bot as tb
+
+
+# Published by scripts.insert_tags whenever the tag set changes
+TAGS_CHANNEL = "tags:invalidate"
+
+
+@dataclass(frozen=True)
+class TagEntry:
+    id: int
+    title: str
+
+
+class TagCatalogue:
+    """Process-wide copy of the tag table with a TTL and explicit invalidation."""
+
+    def __init__(
+        self,
+        ttl: float
+    ) -> None:
+        self.ttl: float = ttl
+        self.tags: tuple[TagEntry, ...] | None = None
+        self.loaded_at: float = 0
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return (
+            self.tags is not None
+            and time.monotonic() - self.loaded_at < self.ttl
+        )
+
+    async def get(
+        self,
+        db: DbWrapper
+    ) -> tuple[TagEntry, ...]:
+        if not self.is_fresh():
+            async with self.lock:
+                if not self.is_fresh():
+                    await self.load(db)
+        return self.tags
+
+    async def load(
+        self,
+        db: DbWrapper
+    ) -> None:
+        rows = (
+            await db.session.execute(
+                select(
+                    tb.Tag.id,
+                    tb.Tag.title
+                ).order_by(tb.Tag.id)
+            )
+        ).all()
+        self.tags = tuple(TagEntry(row.id, row.title) for row in rows)
+        self.loaded_at = time.monotonic()
+
+    def invalidate(
+        self,
+        *_
+    ) -> None:
+        self.tags = None
+
+
+tag_catalogue = TagCatalogue(settings.get("tags.ttl", 300))
@@ -1,7 +1,14 @@
 from aiogram import Bot, Dispatcher, Router
-from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.client.default import DefaultBotProperties
 from src.core.config import settings
+from src.bot.logic.media import MediaRegistry
+from src.bot.logic.invalidation import Invalidator
+from src.bot.logic.storage import MsgpackRedisStorage
+from src.bot.logic.notifications import Notifier
+from src.bot.logic.presence import PresenceWriter
+from src.bot.logic.prefetch import Prefetcher
+from src.core.postgres.bot.engine import open_db_session
+from src.bot.logic.ratelimit import RateLimiterMiddleware
 
 
 bot = Bot(
@@ -11,10 +18,51 @@ bot = Bot(
         protect_content=False
     )
 )
-storage = RedisStorage.from_url(
+rate_limiter = RateLimiterMiddleware(
+    settings.get("rate_limit.global_rate", 30),
+    settings.get("rate_limit.chat_rate", 1),
+    settings.get("rate_limit.chat_burst", 3),
+    settings.get("rate_limit.background_reserve", 5),
+    settings.get("rate_limit.max_retries", 2),
+    settings.get("rate_limit.max_wait", 5)
+)
+bot.session.middleware(rate_limiter)
+storage = MsgpackRedisStorage.from_url(
     f"redis://{settings.redis.host}:{settings.redis.port}?db={settings.redis.database}"
 )
-dispatcher = Dispatcher(storage=storage)
+# ContextMiddleware takes the place of the built-in FSM middleware and
+# writes the record back after the handler, so updates of a chat take turns
+dispatcher = Dispatcher(
+    storage=storage,
+    events_isolation=storage.create_isolation(),
+    disable_fsm=True
+)
+media = MediaRegistry(
+    storage.redis,
+    f"media:{bot.id}",
+    {
+        "logo": "src/bot/assets/logo.jpeg"
+    }
+)
+invalidator = Invalidator(storage.redis)
+presence = PresenceWriter(
+    storage.redis,
+    settings.get("presence.interval", 5)
+)
+notifier = Notifier(
+    storage.redis,
+    bot,
+    storage,
+    f"notifications:{bot.id}",
+    settings.get("notifications.batch_size", 100),
+    settings.get("notifications.rate", 25),
+    settings.get("notifications.max_attempts", 5)
+)
+prefetcher = Prefetcher(
+    open_db_session,
+    storage.redis,
+    settings.get("prefetch.concurrency", 4)
+)
 command_router = Router()
 menu_router = Router()
 simple_router = Router()
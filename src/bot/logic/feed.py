@@ -0,0 +1,336 @@
+from dataclasses import dataclass
+from typing import Any, Iterable
+from redis.asyncio import Redis
+from sqlalchemy import Select, exists, false, func, select
+from src.core.config import settings
+from src.core.postgres.wrapper import DbWrapper
+from src.bot.logic.ranking import SCORE_STEP, ranking, tag_mask
+import src.core.postgres.bot as tb
+
+
+# Marks a feed as built, so an empty feed is not rebuilt on every read
+SENTINEL = "0"
+
+INSERT_EXISTING = """
+local added = 0
+for i, key in ipairs(KEYS) do
+    if redis.call("EXISTS", key) == 1 then
+        added = added + redis.call("ZADD", key, ARGV[i + 1], ARGV[1])
+    end
+end
+return added
+"""
+
+
+def tagged_accounts() -> Select:
+    return (
+        select(
+            tb.Account.id,
+            func.array_remove(
+                func.array_agg(tb.AccountTag.tag_id),
+                None
+            ).label("tag_ids")
+        )
+        .outerjoin(
+            tb.AccountTag,
+            tb.AccountTag.account_id == tb.Account.id
+        )
+        .group_by(tb.Account.id)
+    )
+
+
+def ranked_accounts(
+    account: Any
+) -> Select:
+    stmt = tagged_accounts().where(
+        tb.Account.is_active == True
+    )
+    match account.type:
+        case "mentor":
+            return stmt.where(
+                tb.Account.type == "student",
+                exists().where(
+                    tb.Like.liker_account_id == tb.Account.id,
+                    tb.Like.liked_account_id == account.id
+                )
+            )
+        case "student":
+            return stmt.where(
+                tb.Account.type == "mentor"
+            )
+    return stmt.where(false())
+
+
+def viewer_accounts(
+    account: Any
+) -> Select:
+    stmt = tagged_accounts()
+    match account.type:
+        case "mentor":
+            return stmt.where(
+                tb.Account.type == "student"
+            )
+        case "student":
+            return stmt.where(
+                tb.Account.type == "mentor",
+                exists().where(
+                    tb.Like.liker_account_id == account.id,
+                    tb.Like.liked_account_id == tb.Account.id
+                )
+            )
+    return stmt.where(false())
+
+
+@dataclass(frozen=True)
+class FeedWindow:
+    account_id: int
+    rank: int
+    has_prev: bool
+    has_next: bool
+
+
+class Feed:
+    """Per-account candidate feeds materialized as Redis sorted sets."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        db: DbWrapper
+    ) -> None:
+        self.redis: Redis = redis
+        self.db: DbWrapper = db
+        self.ttl: int = settings.get("feed.ttl", 86400)
+        self.insert_existing = redis.register_script(INSERT_EXISTING)
+        # Redis writes held back until the database transaction commits
+        self.pending: list[tuple] = []
+
+    @staticmethod
+    def key(
+        account_id: int
+    ) -> str:
+        return f"feed:{account_id}"
+
+    async def tag_mask(
+        self,
+        account_id: int
+    ) -> int:
+        return tag_mask(
+            (
+                await self.db.session.scalars(
+                    select(
+                        tb.AccountTag.tag_id
+                    ).where(
+                        tb.AccountTag.account_id == account_id
+                    )
+                )
+            ).all()
+        )
+
+    async def build(
+        self,
+        account: Any
+    ) -> None:
+        rows = (
+            await self.db.session.execute(
+                ranked_accounts(account)
+            )
+        ).all()
+        scores: list[int] = ranking.scores(
+            await self.tag_mask(account.id),
+            [tag_mask(row.tag_ids) for row in rows]
+        )
+        mapping: dict[str, float] = {SENTINEL: float("-inf")}
+        for row, score in zip(rows, scores):
+            mapping[str(row.id)] = ranking.rank(score, row.id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.key(account.id))
+            pipe.zadd(self.key(account.id), mapping)
+            pipe.expire(self.key(account.id), self.ttl)
+            await pipe.execute()
+
+    async def read_window(
+        self,
+        key: str,
+        direction: str,
+        rank: int | None
+    ) -> tuple[bool, list[tuple[bytes, float]], list[bytes]]:
+        """Reads up to two members in the direction and one member behind the cursor."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            match direction:
+                case "prev":
+                    pipe.zrangebyscore(key, f"({rank}", "+inf", start=0, num=2, withscores=True)
+                    pipe.zrevrangebyscore(key, rank, "(-inf", start=0, num=1)
+                case "next":
+                    pipe.zrevrangebyscore(key, f"({rank}", "(-inf", start=0, num=2, withscores=True)
+                    pipe.zrangebyscore(key, rank, "+inf", start=0, num=1)
+                case "at":
+                    pipe.zrevrangebyscore(key, rank, "(-inf", start=0, num=2, withscores=True)
+                    pipe.zrangebyscore(key, f"({rank}", "+inf", start=0, num=1)
+                case _:
+                    pipe.zrevrangebyscore(key, "+inf", "(-inf", start=0, num=2, withscores=True)
+            exists, members, *behind = await pipe.execute()
+        return bool(exists), members, behind[0] if behind else []
+
+    async def window(
+        self,
+        account: Any,
+        direction: str = "first",
+        rank: int | None = None
+    ) -> FeedWindow:
+        """Finds the candidate next to the rank cursor with a keyset read."""
+        built: bool = False
+        while True:
+            exists, members, behind = await self.read_window(
+                self.key(account.id),
+                direction,
+                rank
+            )
+            if not exists and not built:
+                await self.build(account)
+                built = True
+                continue
+            if members:
+                break
+            if direction == "first":
+                raise IndexError(direction)
+            # The cursor ran past the end after the feed changed
+            direction, rank = "first", None
+        member, score = members[0]
+        if direction == "prev":
+            return FeedWindow(int(member), int(score), len(members) > 1, bool(behind))
+        return FeedWindow(int(member), int(score), bool(behind), len(members) > 1)
+
+    async def neighbours(
+        self,
+        account_id: int,
+        rank: int
+    ) -> list[int]:
+        """Returns the candidates right after and right before the rank."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrangebyscore(self.key(account_id), f"({rank}", "(-inf", start=0, num=1)
+            pipe.zrangebyscore(self.key(account_id), f"({rank}", "+inf", start=0, num=1)
+            following, preceding = await pipe.execute()
+        return [int(member) for member in (*following, *preceding)]
+
+    def invalidate(
+        self,
+        account_id: int
+    ) -> None:
+        self.pending.append(("delete", self.key(account_id)))
+
+    def insert(
+        self,
+        account_id: int,
+        ranks: Iterable[tuple[int, int]]
+    ) -> None:
+        """Adds an account to those feeds of the viewers that are built."""
+        keys: list[str] = []
+        args: list[Any] = [account_id]
+        for viewer_id, rank in ranks:
+            keys.append(self.key(viewer_id))
+            args.append(rank)
+        if keys:
+            self.pending.append(("insert", keys, args))
+
+    def remove(
+        self,
+        account_id: int,
+        viewer_ids: Iterable[int]
+    ) -> None:
+        for viewer_id in viewer_ids:
+            self.pending.append(("remove", self.key(viewer_id), account_id))
+
+    async def apply(self) -> None:
+        """Writes the feed changes queued by the committed transaction."""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for command, *args in pending:
+                match command:
+                    case "delete":
+                        pipe.delete(*args)
+                    case "insert":
+                        await self.insert_existing(keys=args[0], args=args[1], client=pipe)
+                    case "remove":
+                        pipe.zrem(*args)
+                    case "shift":
+                        key, member, delta = args
+                        pipe.zadd(key, {member: delta}, xx=True, incr=True)
+            await pipe.execute()
+
+    async def account_changed(
+        self,
+        account: Any
+    ) -> None:
+        """Reconciles an account's type or activity with other feeds."""
+        rows = (
+            await self.db.session.execute(
+                viewer_accounts(account)
+            )
+        ).all()
+        if account.is_active:
+            scores: list[int] = ranking.scores(
+                await self.tag_mask(account.id),
+                [tag_mask(row.tag_ids) for row in rows]
+            )
+            self.insert(
+                account.id,
+                (
+                    (row.id, ranking.rank(score, account.id))
+                    for row, score in zip(rows, scores)
+                )
+            )
+        else:
+            self.remove(
+                account.id,
+                (row.id for row in rows)
+            )
+
+    async def like_toggled(
+        self,
+        account: Any,
+        target_account: Any,
+        is_liked: bool
+    ) -> None:
+        if account.type != "student" or target_account.type != "mentor":
+            return
+        if is_liked and account.is_active:
+            score: int = ranking.score(
+                await self.tag_mask(account.id),
+                await self.tag_mask(target_account.id)
+            )
+            self.insert(
+                account.id,
+                ((target_account.id, ranking.rank(score, account.id)),)
+            )
+        else:
+            self.remove(
+                account.id,
+                (target_account.id,)
+            )
+
+    async def tag_toggled(
+        self,
+        account: Any,
+        tag_id: int,
+        is_added: bool
+    ) -> None:
+        """Shifts the shared-tag score between the account and tag holders."""
+        delta: int = ranking.weight(tag_id) * SCORE_STEP
+        if not is_added:
+            delta = -delta
+        account_ids: Iterable[int] = (
+            await self.db.session.scalars(
+                select(
+                    tb.AccountTag.account_id
+                ).where(
+                    tb.AccountTag.tag_id == tag_id,
+                    tb.AccountTag.account_id != account.id
+                )
+            )
+        ).all()
+        for account_id in account_ids:
+            self.pending.append(("shift", self.key(account.id), account_id, delta))
+            self.pending.append(("shift", self.key(account_id), account.id, delta))
@@ -1,18 +1,22 @@
-from typing import Any, Iterable
+import asyncio
+from dataclasses import replace
+from typing import Any
 
 from aiogram import F, Bot
-from aiogram.types import CallbackQuery, FSInputFile, InputMediaPhoto, BufferedInputFile, Message
+from aiogram.types import CallbackQuery, Message, PhotoSize
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.storage.redis import StorageKey
 from aiogram.utils.i18n import I18n
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 import src.core.postgres.bot as tb
+from src.core.blob import blob_store
 import src.bot.markup.inline as kb
-from src.bot.logic.adapter import DbAdapter, ResponseData
+from src.bot.logic.adapter import DbAdapter, LikeToggle, ResponseData, TagToggle
+from src.bot.logic.snapshots import AccountSnapshot
 from src.bot.logic.states import State, MenuState, Dialogue
-from src.bot.markup.callback_data import MenuAction, EntryAction, DataAction, PaginatedMenuAction
-from src.bot.logic.entities import menu_router
+from src.bot.logic.utils import edit_menu
+from src.bot.markup.callback_data import MenuAction, EntryAction, DataAction, PaginatedMenuAction, CursorMenuAction
+from src.bot.logic.entities import menu_router, media, notifier, presence, prefetcher
+from src.bot.logic.notifications import Notification, Peer
 
 
 @menu_router.callback_query(
@@ -30,10 +34,19 @@ async def set_account_type_show_main_menu(
     account: tb.Account = (
         await db.scalars(
             tb.Account,
-            query.from_user.id == tb.Account.chat_id
+            query.from_user.id == tb.Account.chat_id,
+            load_only=(
+                tb.Account.id,
+                tb.Account.type,
+                tb.Account.is_active
+            )
         )
     ).first()
     account.type = callback_data.data
+    db.account_changed(query.from_user.id)
+    await db.flush()
+    db.feed.invalidate(account.id)
+    await db.feed.account_changed(account)
     await db.commit()
     response_data: ResponseData = await db.main_menu_response(
         i18n,
@@ -53,38 +66,34 @@ async def set_account_type_show_main_menu(
 )
 async def show_main_menu(
     query: CallbackQuery,
+    bot: Bot,
     state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
     i18n: I18n
 ):
-    account: tb.Account = (
-        await db.scalars(
-            tb.Account,
-            tb.Account.chat_id == query.from_user.id
-        )
-    ).one()
+    account: AccountSnapshot = await db.snapshot(query.from_user.id)
     handle: str | None = query.from_user.username
     if handle is not None:
         handle = handle.lower()
-    account.handle = handle
-    account.is_active = True
-    await db.commit()
+    if not account.is_active:
+        await db.activate(account.chat_id, handle)
+        await db.commit()
+    elif account.handle != handle:
+        presence.note(account.chat_id, handle)
     response_data: ResponseData = await db.main_menu_response(
         i18n,
         state_data["locale"]
     )
     await state.set_state(MenuState.Menu)
-    await query.message.edit_media(
-        InputMediaPhoto(
-            media=FSInputFile(
-                "src/bot/assets/logo.jpeg"
-            )
-        )
-    )
-    await query.message.edit_caption(
-        caption=response_data.text,
-        reply_markup=response_data.markup
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        response_data.text,
+        response_data.markup,
+        await media.get("logo")
     )
     await query.answer()
 
@@ -96,6 +105,7 @@ async def show_main_menu(
 )
 async def show_account_menu(
     query: CallbackQuery,
+    bot: Bot,
     state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
@@ -109,27 +119,26 @@ async def show_account_menu(
     await state.set_state(MenuState.Menu)
     await state.update_data(
         {
-            "entry_data": {
-                "page": 0
-            }
+            "entry_data": {}
         }
     )
-    if response_data.file:
-        await query.message.edit_media(
-            InputMediaPhoto(
-                media=BufferedInputFile(
-                    response_data.file,
-                    "image"
-                )
-            )
-        )
-    await query.message.edit_caption(
-        caption=response_data.text,
-        reply_markup=response_data.markup
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        response_data.text,
+        response_data.markup,
+        response_data.file
     )
     await query.answer()
 
 
+@menu_router.callback_query(
+    CursorMenuAction.filter(
+        F.action == "show_account_list"
+    )
+)
 @menu_router.callback_query(
     PaginatedMenuAction.filter(
         F.action == "show_account_list"
@@ -137,38 +146,44 @@ async def show_account_menu(
 )
 async def show_account_list(
     query: CallbackQuery,
+    bot: Bot,
     state_data: dict[str, Any],
     state: FSMContext,
-    callback_data: PaginatedMenuAction,
+    callback_data: CursorMenuAction | PaginatedMenuAction,
     db: DbAdapter,
     i18n: I18n
 ):
+    # Menus sent before keyset paging carry a page number and start over
+    if isinstance(callback_data, PaginatedMenuAction):
+        callback_data = CursorMenuAction(
+            action=callback_data.action,
+            direction="first",
+            score=0,
+            entry_id=0
+        )
     response_data: ResponseData = await db.account_list_response(
         query.from_user.id,
-        callback_data.page,
+        callback_data.direction,
+        callback_data.score,
+        callback_data.entry_id,
         i18n,
         state_data["locale"]
     )
     await state.update_data(
         {
-            "entry_data": {
-                "page": callback_data.page
-            }
+            "entry_data": response_data.entry_data
         }
     )
-    if response_data.file:
-        await query.message.edit_media(
-            InputMediaPhoto(
-                media=BufferedInputFile(
-                    response_data.file,
-                    "image"
-                )
-            )
-        )
-    await query.message.edit_caption(
-        caption=response_data.text,
-        reply_markup=response_data.markup
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        response_data.text,
+        response_data.markup,
+        response_data.file
     )
+    prefetcher.schedule(query.from_user.id, response_data.entry_data)
 
 
 @menu_router.callback_query(
@@ -178,6 +193,8 @@ async def show_account_list(
 )
 async def show_account_tag_list(
     query: CallbackQuery,
+    bot: Bot,
+    state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
     i18n: I18n
@@ -187,16 +204,14 @@ async def show_account_tag_list(
         i18n,
         state_data["locale"]
     )
-    await query.message.edit_media(
-        InputMediaPhoto(
-            media=FSInputFile(
-                "src/bot/assets/logo.jpeg"
-            )
-        )
-    )
-    await query.message.edit_caption(
-        caption=response_data.text,
-        reply_markup=response_data.markup
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        response_data.text,
+        response_data.markup,
+        await media.get("logo")
     )
     await query.answer()
 
@@ -213,46 +228,26 @@ async def toggle_account_tag(
     db: DbAdapter,
     i18n: I18n
 ):
-    tags: Iterable[tb.Tag] = (
-        await db.scalars(
-            tb.Tag
-        )
-    ).all()
-    account: tb.Account = (
-        await db.scalars(
-            tb.Account,
-            tb.Account.chat_id == query.from_user.id,
-            join=(
-                (
-                    tb.Account.account_tags,
-                    tb.AccountTag.tag
-                ),
-            )
-        )
-    ).unique().one()
-    if callback_data.entry_id in [at.tag.id for at in account.account_tags]:
-        for at in account.account_tags:
-            if at.tag.id == callback_data.entry_id:
-                await db.delete(at)
-                account.account_tags.remove(at)
-                break
+    account: AccountSnapshot = await db.snapshot(query.from_user.id)
+    toggle: TagToggle = await db.toggle_tag(account.id, callback_data.entry_id)
+    # Score shifts are relative, so only the click that changed the row applies them
+    if toggle.is_changed:
+        await db.feed.tag_toggled(account, callback_data.entry_id, toggle.is_added)
+    db.card_changed(account.id)
+    db.account_changed(account.chat_id)
+    tag_ids: set[int] = set(account.tag_ids)
+    if toggle.is_added:
+        tag_ids.add(callback_data.entry_id)
     else:
-        account_tag = tb.AccountTag(
-            account_id=account.id,
-            tag_id=callback_data.entry_id
-        )
-        account_tag.tag = [t for t in tags if t.id == callback_data.entry_id][0]
-        account.account_tags.append(account_tag)
-        db.add(account_tag)
-    await db.flush()
+        tag_ids.discard(callback_data.entry_id)
     await query.message.edit_caption(
         caption=i18n.gettext(
             "account_tag_list.text",
             locale=state_data["locale"]
         ),
         reply_markup=kb.account_tag_list(
-            tags,
-            account.account_tags,
+            await db.tags(),
+            tag_ids,
             i18n,
             state_data["locale"]
         )
@@ -268,117 +263,64 @@ async def toggle_account_tag(
 )
 async def toggle_account_like(
     query: CallbackQuery,
-    bot: Bot,
-    state: FSMContext,
     state_data: dict[str, Any],
     callback_data: EntryAction,
     db: DbAdapter,
     i18n: I18n
 ):
-    account: tb.Account = (
-        await db.scalars(
-            tb.Account,
-            tb.Account.chat_id == query.from_user.id,
-            join=(
-                (
-                    tb.Account.likes,
-                    tb.Like.liker_account,
-                    tb.Account.account_tags,
-                    tb.AccountTag.tag
-                ),
-                (
-                    tb.Account.liked_by,
-                    tb.Like.liker_account,
-                    tb.Account.account_tags,
-                    tb.AccountTag.tag
-                ),
-                (
-                    tb.Account.account_tags,
-                    tb.AccountTag.tag
-                )
-            )
-        )
-    ).unique().one()
+    account: AccountSnapshot = await db.snapshot(query.from_user.id)
     target_account: tb.Account = (
         await db.scalars(
             tb.Account,
             tb.Account.id == callback_data.entry_id,
-            join=(
-                (
-                    tb.Account.liked_by,
-                ),
+            load_only=(
+                tb.Account.id,
+                tb.Account.type,
+                tb.Account.chat_id,
+                tb.Account.full_name
             )
         )
-    ).unique().one()
-    if account.id in [l.liker_account_id for l in target_account.liked_by]:
-        for l in account.likes:
-            if l.liked_account_id == target_account.id:
-                await db.delete(l)
-                break
-        to_send = False
+    ).one()
+    toggle: LikeToggle = await db.toggle_like(
+        account.id,
+        target_account.id
+    )
+    await db.feed.like_toggled(account, target_account, toggle.is_liked)
+    db.account_changed(account.chat_id)
+    liked_ids: set[int] = set(account.liked_ids)
+    if toggle.is_liked:
+        liked_ids.add(target_account.id)
     else:
-        like = tb.Like(
-            liker_account_id=account.id,
-            liked_account_id=target_account.id
-        )
-        db.add(like)
-        to_send = True
-    await db.flush()
-    await db.session.refresh(account, ["likes"])
-    await db.session.refresh(target_account, ["liked_by"])
-    if to_send:
+        liked_ids.discard(target_account.id)
+    account = replace(account, liked_ids=frozenset(liked_ids))
+    notifications: list[Notification] = []
+    if toggle.is_created:
         match account.type:
             case "student":
-                try:
-                    locale: str = (
-                        await state.storage.get_data(
-                            StorageKey(
-                                bot.id,
-                                target_account.chat_id,
-                                target_account.chat_id
-                            )
-                        )
-                    )["locale"]
-                    await bot.send_message(
-                        chat_id=target_account.chat_id,
-                        text=i18n.gettext(
-                            "announcement.text.someone_liked_you",
-                            locale=locale
-                        ),
-                        reply_markup=kb.popup(
-                            i18n,
-                            locale=locale
-                        )
+                notifications.append(
+                    Notification(
+                        target_account.chat_id,
+                        "someone_liked_you"
                     )
-                except (KeyError, TelegramForbiddenError, TelegramBadRequest):
-                    pass
-            case "mentor":
+                )
+            case "mentor" if toggle.is_mutual:
                 for a, ac in zip((target_account, account), (account, target_account)):
-                    try:
-                        locale: str = (
-                            await state.storage.get_data(
-                                StorageKey(
-                                    bot.id,
-                                    a.chat_id,
-                                    a.chat_id
-                                )
-                            )
-                        )["locale"]
-                        await bot.send_message(
-                            chat_id=a.chat_id,
-                            text=i18n.gettext(
-                                "announcement.text.match_found",
-                                locale=locale
-                            ),
-                            reply_markup=kb.account_link(
-                                ac
+                    notifications.append(
+                        Notification(
+                            a.chat_id,
+                            "match_found",
+                            Peer(
+                                ac.chat_id,
+                                ac.full_name
                             )
                         )
-                    except (KeyError, TelegramForbiddenError, TelegramBadRequest):
-                        pass
+                    )
+    entry_data: dict[str, Any] = state_data.get("entry_data") or {}
     response_data: ResponseData = await db.account_list_response(
         account,
-        state_data["entry_data"]["page"],
+        "at" if "entry_id" in entry_data else "first",
+        entry_data.get("score", 0),
+        entry_data.get("entry_id", 0),
         i18n,
         state_data["locale"]
     )
@@ -387,6 +329,7 @@ async def toggle_account_like(
         reply_markup=response_data.markup
     )
     await db.commit()
+    await notifier.enqueue(*notifications)
     await query.answer()
 
 
@@ -397,29 +340,28 @@ async def toggle_account_like(
 )
 async def ask_account_image(
     query: CallbackQuery,
+    bot: Bot,
     state: FSMContext,
     state_data: dict[str, Any],
     i18n: I18n
 ):
     next_state: State = Dialogue.AccountImage
     await state.set_state(next_state)
-    await query.message.edit_media(
-        InputMediaPhoto(
-            media=FSInputFile(
-                "src/bot/assets/logo.jpeg"
-            )
-        )
-    )
-    await query.message.edit_caption(
-        caption=i18n.gettext(
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        i18n.gettext(
             "dialogue.account_image.text",
             locale=state_data["locale"]
         ),
-        reply_markup=kb.question(
+        kb.question(
             next_state,
             i18n,
             state_data["locale"]
-        )
+        ),
+        await media.get("logo")
     )
     await query.answer()
 
@@ -431,29 +373,28 @@ async def ask_account_image(
 )
 async def ask_account_full_name(
     query: CallbackQuery,
+    bot: Bot,
     state: FSMContext,
     state_data: dict[str, Any],
     i18n: I18n
 ):
     next_state: State = Dialogue.AccountFullName
     await state.set_state(next_state)
-    await query.message.edit_media(
-        InputMediaPhoto(
-            media=FSInputFile(
-                "src/bot/assets/logo.jpeg"
-            )
-        )
-    )
-    await query.message.edit_caption(
-        caption=i18n.gettext(
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        i18n.gettext(
             "dialogue.account_full_name.text",
             locale=state_data["locale"]
         ),
-        reply_markup=kb.question(
+        kb.question(
             next_state,
             i18n,
             state_data["locale"]
-        )
+        ),
+        await media.get("logo")
     )
     await query.answer()
 
@@ -465,29 +406,28 @@ async def ask_account_full_name(
 )
 async def ask_account_description(
     query: CallbackQuery,
+    bot: Bot,
     state: FSMContext,
     state_data: dict[str, Any],
     i18n: I18n
 ):
     next_state: State = Dialogue.AccountDescription
     await state.set_state(next_state)
-    await query.message.edit_media(
-        InputMediaPhoto(
-            media=FSInputFile(
-                "src/bot/assets/logo.jpeg"
-            )
-        )
-    )
-    await query.message.edit_caption(
-        caption=i18n.gettext(
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        i18n.gettext(
             "dialogue.account_description.text",
             locale=state_data["locale"]
         ),
-        reply_markup=kb.question(
+        kb.question(
             next_state,
             i18n,
             state_data["locale"]
-        )
+        ),
+        await media.get("logo")
     )
     await query.answer()
 
@@ -496,6 +436,7 @@ async def ask_account_description(
 async def set_account_full_name_show_menu(
     message: Message,
     bot: Bot,
+    state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
     i18n: I18n
@@ -508,38 +449,34 @@ async def set_account_full_name_show_menu(
                 tb.Account.chat_id == message.from_user.id,
                 join=(
                     (
-                        tb.Account.likes,
-                    ),
-                    (
+                        "selectin",
                         tb.Account.account_tags,
+                        "joined",
                         tb.AccountTag.tag
                     ),
+                ),
+                undefer=(
+                    tb.Account.description,
                 )
             )
         ).unique().one()
         account.full_name = message.html_text
+        db.card_changed(account.id)
+        db.account_changed(message.from_user.id)
         response_data: ResponseData = await db.account_menu_response(
             account,
             i18n,
             state_data["locale"]
         )
         await db.commit()
-        if response_data.file:
-            await bot.edit_message_media(
-                chat_id=message.from_user.id,
-                message_id=state_data["menu_message_id"],
-                media=InputMediaPhoto(
-                    media=BufferedInputFile(
-                        response_data.file,
-                        filename="image"
-                    )
-                )
-            )
-        await bot.edit_message_caption(
-            chat_id=message.from_user.id,
-            message_id=state_data["menu_message_id"],
-            caption=response_data.text,
-            reply_markup=response_data.markup
+        await edit_menu(
+            bot,
+            message.from_user.id,
+            state,
+            state_data,
+            response_data.text,
+            response_data.markup,
+            response_data.file
         )
 
 
@@ -547,6 +484,7 @@ async def set_account_full_name_show_menu(
 async def set_account_description_show_menu(
     message: Message,
     bot: Bot,
+    state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
     i18n: I18n
@@ -559,38 +497,33 @@ async def set_account_description_show_menu(
                 tb.Account.chat_id == message.from_user.id,
                 join=(
                     (
-                        tb.Account.likes,
-                    ),
-                    (
+                        "selectin",
                         tb.Account.account_tags,
+                        "joined",
                         tb.AccountTag.tag
                     ),
+                ),
+                undefer=(
+                    tb.Account.description,
                 )
             )
         ).unique().one()
         account.description = message.html_text
+        db.card_changed(account.id)
         response_data: ResponseData = await db.account_menu_response(
             account,
             i18n,
             state_data["locale"]
         )
         await db.commit()
-        if response_data.file:
-            await bot.edit_message_media(
-                chat_id=message.from_user.id,
-                message_id=state_data["menu_message_id"],
-                media=InputMediaPhoto(
-                    media=BufferedInputFile(
-                        response_data.file,
-                        filename="image"
-                    ),
-                )
-            )
-        await bot.edit_message_caption(
-            chat_id=message.from_user.id,
-            message_id=state_data["menu_message_id"],
-            caption=response_data.text,
-            reply_markup=response_data.markup
+        await edit_menu(
+            bot,
+            message.from_user.id,
+            state,
+            state_data,
+            response_data.text,
+            response_data.markup,
+            response_data.file
         )
 
 
@@ -598,6 +531,7 @@ async def set_account_description_show_menu(
 async def set_account_image_show_menu(
     message: Message,
     bot: Bot,
+    state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
     i18n: I18n
@@ -610,40 +544,42 @@ async def set_account_image_show_menu(
                 tb.Account.chat_id == message.from_user.id,
                 join=(
                     (
-                        tb.Account.likes,
-                    ),
-                    (
+                        "selectin",
                         tb.Account.account_tags,
+                        "joined",
                         tb.AccountTag.tag
                     ),
+                ),
+                undefer=(
+                    tb.Account.description,
                 )
             )
         ).unique().one()
-        with await bot.download(
-                message.photo[-1].file_id
-        ) as stream:
-            image = stream.read()
-        account.image = image
+        photo: PhotoSize = message.photo[-1]
+        account.image_file_id = photo.file_id
+        account.image_file_unique_id = photo.file_unique_id
+        db.card_changed(account.id)
+        if blob_store is not None:
+            with await bot.download(
+                    photo.file_id
+            ) as stream:
+                image = stream.read()
+            account.image_hash = await asyncio.to_thread(blob_store.put, image)
+        else:
+            # The bytes never pass through the bot, so there is no digest
+            account.image_hash = None
         response_data: ResponseData = await db.account_menu_response(
             account,
             i18n,
             state_data["locale"]
         )
         await db.commit()
-        if response_data.file:
-            await bot.edit_message_media(
-                chat_id=message.from_user.id,
-                message_id=state_data["menu_message_id"],
-                media=InputMediaPhoto(
-                    media=BufferedInputFile(
-                        response_data.file,
-                        filename="image"
-                    ),
-                )
-            )
-        await bot.edit_message_caption(
-            chat_id=message.from_user.id,
-            message_id=state_data["menu_message_id"],
-            caption=response_data.text,
-            reply_markup=response_data.markup
+        await edit_menu(
+            bot,
+            message.from_user.id,
+            state,
+            state_data,
+            response_data.text,
+            response_data.markup,
+            response_data.file
         )
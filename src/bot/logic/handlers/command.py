@@ -4,7 +4,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.utils.i18n import I18n
 from aiogram.utils.i18n.middleware import FSMI18nMiddleware
 from src.bot.logic.states import MenuState
-from src.bot.logic.entities import command_router
+from src.bot.logic.entities import command_router, media, presence
 from src.bot.logic.adapter import DbAdapter
 import src.core.postgres.bot as tb
 import src.bot.markup.inline as kb
@@ -23,12 +23,21 @@ async def register_account_send_main_menu(
     account: tb.Account = (
         await db.scalars(
             tb.Account,
-            tb.Account.chat_id == message.from_user.id
+            tb.Account.chat_id == message.from_user.id,
+            load_only=(
+                tb.Account.id,
+                tb.Account.type,
+                tb.Account.is_active,
+                tb.Account.handle
+            )
         )
     ).first()
     answer: Message
     text: str
     markup: InlineKeyboardMarkup
+    handle: str | None = message.from_user.username
+    if handle is not None:
+        handle = handle.lower()
     if not account:
         user_full_name: str = ""
         if message.from_user.first_name:
@@ -38,6 +47,7 @@ async def register_account_send_main_menu(
         account = tb.Account(
             type="account",
             chat_id=message.from_user.id,
+            handle=handle,
             full_name=user_full_name
         )
         db.add(account)
@@ -46,11 +56,10 @@ async def register_account_send_main_menu(
             await i18n_middleware.set_locale(state, message.from_user.language_code)
         else:
             await i18n_middleware.set_locale(state, "ru")
-    handle: str | None = message.from_user.username
-    if handle is not None:
-        handle = handle.lower()
-    account.handle = handle
-    account.is_active = True
+    elif not account.is_active:
+        await db.activate(message.from_user.id, handle)
+    elif account.handle != handle:
+        presence.note(message.from_user.id, handle)
     locale = (await state.get_data())["locale"]
     await state.set_state(MenuState.Menu)
     if account.type == "account":
@@ -65,19 +74,18 @@ async def register_account_send_main_menu(
             locale=locale
         )
         markup = kb.main_menu(i18n, locale)
+    logo: str | FSInputFile = await media.get("logo")
     answer = await message.answer_photo(
-        FSInputFile(
-            "src/bot/assets/logo.jpeg"
-        ),
+        logo,
         caption=text,
         reply_markup=markup
     )
+    await media.remember(logo, answer)
     await db.commit()
     await state.update_data(
         {
             "menu_message_id": answer.message_id,
-            "entry_data": {
-                "page": 0
-            }
+            "menu_media": await media.get("logo"),
+            "entry_data": {}
         }
     )
@@ -1,10 +1,11 @@
 from typing import Any
-from aiogram import F
-from aiogram.types import CallbackQuery, InputMediaPhoto, BufferedInputFile
+from aiogram import F, Bot
+from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.i18n import I18n
 from src.bot.logic.states import MenuState
 from src.bot.logic.adapter import DbAdapter, ResponseData
+from src.bot.logic.utils import edit_menu
 from src.bot.markup.callback_data import MenuAction
 from src.bot.logic.entities import menu_router
 
@@ -16,6 +17,7 @@ from src.bot.logic.entities import menu_router
 )
 async def end_dialogue(
     query: CallbackQuery,
+    bot: Bot,
     state: FSMContext,
     state_data: dict[str, Any],
     db: DbAdapter,
@@ -31,17 +33,13 @@ async def end_dialogue(
             )
     await state.set_state(MenuState.Menu)
     # noinspection PyUnboundLocalVariable
-    if response_data.file:
-        await query.message.edit_media(
-            InputMediaPhoto(
-                media=BufferedInputFile(
-                    response_data.file,
-                    "image"
-                )
-            )
-        )
-    await query.message.edit_caption(
-        caption=response_data.text,
-        reply_markup=response_data.markup
+    await edit_menu(
+        bot,
+        query.from_user.id,
+        state,
+        state_data,
+        response_data.text,
+        response_data.markup,
+        response_data.file
     )
     await query.answer()
@@ -22,15 +22,25 @@ async def account_blocked_bot(
     event: ChatMemberUpdated,
     db: DbAdapter
 ):
-    await db.session.execute(
-        update(tb.Account)
-        .where(
-            tb.Account.chat_id == event.from_user.id
+    account = (
+        await db.session.execute(
+            update(tb.Account)
+            .where(
+                tb.Account.chat_id == event.from_user.id
+            )
+            .values(
+                is_active=False
+            )
+            .returning(
+                tb.Account.id,
+                tb.Account.type,
+                tb.Account.is_active
+            )
         )
-        .values(
-            is_active=False
-        )
-    )
+    ).one_or_none()
+    if account is not None:
+        await db.feed.account_changed(account)
+        db.account_changed(event.from_user.id)
     await db.commit()
 
 
@@ -41,15 +51,25 @@ async def account_unblocked_bot(
     event: ChatMemberUpdated,
     db: DbAdapter
 ):
-    await db.session.execute(
-        update(tb.Account)
-        .where(
-            tb.Account.chat_id == event.from_user.id
+    account = (
+        await db.session.execute(
+            update(tb.Account)
+            .where(
+                tb.Account.chat_id == event.from_user.id
+            )
+            .values(
+                is_active=True
+            )
+            .returning(
+                tb.Account.id,
+                tb.Account.type,
+                tb.Account.is_active
+            )
         )
-        .values(
-            is_active=True
-        )
-    )
+    ).one_or_none()
+    if account is not None:
+        await db.feed.account_changed(account)
+        db.account_changed(event.from_user.id)
     await db.commit()
 
 
@@ -0,0 +1,37 @@
+from typing import Callable
+from redis.asyncio import Redis
+
+
+class Invalidator:
+    """Fans Redis pub/sub invalidation messages out to in-process caches."""
+
+    def __init__(
+        self,
+        redis: Redis
+    ) -> None:
+        self.redis: Redis = redis
+        self.callbacks: dict[str, list[Callable[[bytes], None]]] = {}
+
+    def register(
+        self,
+        channel: str,
+        callback: Callable[[bytes], None]
+    ) -> None:
+        self.callbacks.setdefault(channel, []).append(callback)
+
+    async def publish(
+        self,
+        channel: str,
+        payload: str | int = ""
+    ) -> None:
+        await self.redis.publish(channel, payload)
+
+    async def run(self) -> None:
+        async with self.redis.pubsub() as pubsub:
+            await pubsub.subscribe(*self.callbacks)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                channel: str = message["channel"].decode()
+                for callback in self.callbacks.get(channel, ()):
+                    callback(message["data"])
@@ -0,0 +1,58 @@
+from aiogram.types import FSInputFile, Message
+from redis.asyncio import Redis
+
+
+class MediaRegistry:
+    """Static assets that are uploaded once and then sent by file_id."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str,
+        assets: dict[str, str]
+    ) -> None:
+        self.redis: Redis = redis
+        self.prefix: str = prefix
+        self.assets: dict[str, str] = assets
+        self.file_ids: dict[str, str] = {}
+
+    def key(
+        self,
+        name: str
+    ) -> str:
+        return f"{self.prefix}:{name}"
+
+    async def load(self) -> None:
+        names: list[str] = list(self.assets)
+        for name, file_id in zip(
+            names,
+            await self.redis.mget([self.key(name) for name in names])
+        ):
+            if file_id is not None:
+                self.file_ids[name] = file_id.decode()
+
+    async def get(
+        self,
+        name: str
+    ) -> str | FSInputFile:
+        if name not in self.file_ids:
+            file_id: bytes | None = await self.redis.get(self.key(name))
+            if file_id is None:
+                return FSInputFile(self.assets[name])
+            self.file_ids[name] = file_id.decode()
+        return self.file_ids[name]
+
+    async def remember(
+        self,
+        media: str | FSInputFile,
+        message: Message | bool
+    ) -> None:
+        """Stores the file_id Telegram assigned to a freshly uploaded asset."""
+        if not isinstance(media, FSInputFile):
+            return
+        if not isinstance(message, Message) or not message.photo:
+            return
+        for name, path in self.assets.items():
+            if str(media.path) == path:
+                self.file_ids[name] = message.photo[-1].file_id
+                await self.redis.set(self.key(name), self.file_ids[name])
@@ -1,8 +1,15 @@
 from typing import Any, Callable, Awaitable
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
-from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram import BaseMiddleware, Bot
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, BaseEventIsolation, StorageKey
+from aiogram.types import TelegramObject, Update
+from aiogram.utils.i18n import I18n
+from aiogram.utils.i18n.middleware import FSMI18nMiddleware
 from src.bot.logic.adapter import DbAdapter
+from src.bot.logic.storage import BufferedFSMContext, MsgpackRedisStorage
+from src.bot.stream import UpdateStream
 
 
 class MenuVerifierMiddleware(BaseMiddleware):
@@ -23,23 +30,82 @@ class MenuVerifierMiddleware(BaseMiddleware):
             )
 
 
-class StateDataGetterMiddleware(BaseMiddleware):
+class ContextMiddleware(FSMContextMiddleware):
+    """Loads the FSM record once per update, resolves the locale and saves changes once."""
+
+    def __init__(
+            self,
+            storage: MsgpackRedisStorage,
+            events_isolation: BaseEventIsolation,
+            i18n_middleware: FSMI18nMiddleware
+    ) -> None:
+        super().__init__(storage, events_isolation)
+        self.i18n_middleware: FSMI18nMiddleware = i18n_middleware
+
+    def get_context(
+        self,
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        thread_id: int | None = None,
+        business_connection_id: str | None = None,
+        destiny: str = DEFAULT_DESTINY
+    ) -> BufferedFSMContext:
+        return BufferedFSMContext(
+            self.storage,
+            StorageKey(
+                user_id=user_id,
+                chat_id=chat_id,
+                bot_id=bot.id,
+                thread_id=thread_id,
+                business_connection_id=business_connection_id,
+                destiny=destiny
+            )
+        )
+
+    async def localized(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        i18n: I18n = self.i18n_middleware.i18n
+        locale: str = await self.i18n_middleware.get_locale(event, data) or i18n.default_locale
+        data["i18n"] = i18n
+        data["i18n_middleware"] = self.i18n_middleware
+        if "state" in data:
+            data["state_data"] = await data["state"].get_data()
+        with i18n.context(), i18n.use_locale(locale):
+            return await handler(event, data)
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        data["state_data"] = await data["state"].get_data()
-        return await handler(event, data)
+        context: BufferedFSMContext | None = self.resolve_event_context(data["bot"], data)
+        data["fsm_storage"] = self.storage
+        if context is None:
+            return await self.localized(handler, event, data)
+        async with self.events_isolation.lock(key=context.key):
+            await context.load()
+            data["state"] = context
+            data["raw_state"] = context.state
+            try:
+                return await self.localized(handler, event, data)
+            finally:
+                await context.flush()
 
 
 class DbAdapterMiddleware(BaseMiddleware):
     def __init__(
             self,
-            open_db_session: Callable[..., AsyncSession]
+            open_db_session: Callable[..., AsyncSession],
+            redis: Redis
     ) -> None:
         self.open_db_session: Callable[..., AsyncSession] = open_db_session
+        self.redis: Redis = redis
 
     async def __call__(
         self,
@@ -48,5 +114,26 @@ class DbAdapterMiddleware(BaseMiddleware):
         data: dict[str, Any],
     ) -> Any:
         async with self.open_db_session() as session:
-            data["db"] = DbAdapter(session)
+            data["db"] = DbAdapter(session, self.redis)
             return await handler(event, data)
+
+
+class UpdatePublisherMiddleware(BaseMiddleware):
+    def __init__(
+            self,
+            stream: UpdateStream
+    ) -> None:
+        self.stream: UpdateStream = stream
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        chat_id: int = 0
+        if data.get("event_chat") is not None:
+            chat_id = data["event_chat"].id
+        elif data.get("event_from_user") is not None:
+            chat_id = data["event_from_user"].id
+        await self.stream.publish(event, chat_id)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+)
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.i18n import I18n
+from redis.asyncio import Redis
+
+import src.bot.markup.inline as kb
+from src.bot.logic.ratelimit import background
+
+
+logger = logging.getLogger(__name__)
+
+# Moves taken notifications back unless another task already did
+REQUEUE = """
+for i = 1, #ARGV do
+    if redis.call("LREM", KEYS[2], 1, ARGV[i]) == 1 then
+        redis.call("RPUSH", KEYS[1], ARGV[i])
+    end
+end
+"""
+
+
+@dataclass(frozen=True)
+class Peer:
+    chat_id: int
+    full_name: str
+
+
+@dataclass(frozen=True)
+class Notification:
+    chat_id: int
+    # "someone_liked_you" or "match_found"
+    kind: str
+    peer: Peer | None = None
+    attempts: int = 0
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(
+        cls,
+        raw: bytes | str
+    ) -> "Notification":
+        data = json.loads(raw)
+        if data["peer"] is not None:
+            data["peer"] = Peer(**data["peer"])
+        return cls(**data)
+
+
+class Notifier:
+    """Redis list outbox for announcements, drained by a background task.
+
+    Taken notifications wait in a processing list until they are sent, so a
+    crash or a shutdown mid-batch puts them back instead of losing them.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        bot: Bot,
+        storage: BaseStorage,
+        key: str,
+        batch_size: int = 100,
+        rate: float = 25,
+        max_attempts: int = 5
+    ) -> None:
+        self.redis: Redis = redis
+        self.bot: Bot = bot
+        self.storage: BaseStorage = storage
+        self.key: str = key
+        self.processing: str = f"{key}:processing"
+        self.batch_size: int = batch_size
+        self.interval: float = 1 / rate
+        self.max_attempts: int = max_attempts
+        self.requeue_taken = redis.register_script(REQUEUE)
+
+    async def enqueue(
+        self,
+        *notifications: Notification
+    ) -> None:
+        if notifications:
+            await self.redis.lpush(
+                self.key,
+                *(n.dumps() for n in notifications)
+            )
+
+    async def requeue(
+        self,
+        batch: list[tuple[bytes, Notification]]
+    ) -> None:
+        """Puts unsent notifications back at the head of the queue."""
+        if batch:
+            await self.requeue_taken(
+                keys=[self.key, self.processing],
+                args=[raw for raw, _ in reversed(batch)]
+            )
+
+    async def recover(self) -> None:
+        """Returns the notifications left taken by a stopped drain task."""
+        recovered: int = 0
+        while await self.redis.lmove(self.processing, self.key, "LEFT", "RIGHT") is not None:
+            recovered += 1
+        if recovered:
+            logger.info("Requeued %d unsent notifications", recovered)
+
+    async def done(
+        self,
+        raw: bytes
+    ) -> None:
+        await self.redis.lrem(self.processing, 1, raw)
+
+    async def next_batch(self) -> list[tuple[bytes, Notification]]:
+        first = await self.redis.blmove(self.key, self.processing, 0, "RIGHT", "LEFT")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for _ in range(self.batch_size - 1):
+                pipe.lmove(self.key, self.processing, "RIGHT", "LEFT")
+            rest = [raw for raw in await pipe.execute() if raw is not None]
+        batch: list[tuple[bytes, Notification]] = []
+        seen: set[tuple] = set()
+        for raw in (first, *rest):
+            notification = Notification.loads(raw)
+            # Repeated clicks within one batch collapse into one message per chat
+            dedup_key = (notification.chat_id, notification.kind, notification.peer)
+            if dedup_key in seen:
+                await self.done(raw)
+                continue
+            seen.add(dedup_key)
+            batch.append((raw, notification))
+        return batch
+
+    async def render(
+        self,
+        notification: Notification,
+        i18n: I18n
+    ) -> tuple[str, InlineKeyboardMarkup] | None:
+        locale: str | None = (
+            await self.storage.get_data(
+                StorageKey(
+                    self.bot.id,
+                    notification.chat_id,
+                    notification.chat_id
+                )
+            )
+        ).get("locale")
+        if locale is None:
+            return None
+        text: str = i18n.gettext(
+            f"announcement.text.{notification.kind}",
+            locale=locale
+        )
+        if notification.peer is not None:
+            return text, kb.account_link(notification.peer)
+        return text, kb.popup(i18n, locale)
+
+    async def send(
+        self,
+        notification: Notification,
+        i18n: I18n
+    ) -> None:
+        rendered = await self.render(notification, i18n)
+        if rendered is None:
+            return
+        text, markup = rendered
+        with background():
+            await self.bot.send_message(
+                chat_id=notification.chat_id,
+                text=text,
+                reply_markup=markup
+            )
+
+    async def retry(
+        self,
+        raw: bytes,
+        notification: Notification
+    ) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if notification.attempts + 1 < self.max_attempts:
+                pipe.lpush(
+                    self.key,
+                    Notification(
+                        notification.chat_id,
+                        notification.kind,
+                        notification.peer,
+                        notification.attempts + 1
+                    ).dumps()
+                )
+            else:
+                logger.warning("Dropped notification for chat %s", notification.chat_id)
+            pipe.lrem(self.processing, 1, raw)
+            await pipe.execute()
+
+    async def deliver(
+        self,
+        batch: list[tuple[bytes, Notification]],
+        i18n: I18n
+    ) -> None:
+        finished: int = 0
+        try:
+            for raw, notification in batch:
+                try:
+                    await self.send(notification, i18n)
+                except TelegramRetryAfter as e:
+                    await self.requeue(batch[finished:])
+                    await asyncio.sleep(e.retry_after)
+                    return
+                except (TelegramForbiddenError, TelegramBadRequest):
+                    await self.done(raw)
+                except Exception:
+                    logger.exception("Failed to send notification to chat %s", notification.chat_id)
+                    await self.retry(raw, notification)
+                else:
+                    await self.done(raw)
+                finished += 1
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            # Hands the rest to the other drain tasks before shutting down
+            await self.requeue(batch[finished:])
+            raise
+
+    async def run(
+        self,
+        i18n: I18n
+    ) -> None:
+        while True:
+            try:
+                await self.recover()
+                break
+            except Exception:
+                logger.exception("Failed to requeue unsent notifications")
+                await asyncio.sleep(1)
+        while True:
+            try:
+                await self.deliver(await self.next_batch(), i18n)
+            except Exception:
+                # Keeps draining once Redis is reachable again
+                logger.exception("Failed to drain the notification queue")
+                await asyncio.sleep(1)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Any, Callable
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.bot.logic.adapter import DbAdapter
+from src.bot.logic.ranking import ranking
+
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Warms the profile cards around the one a chat is viewing."""
+
+    def __init__(
+        self,
+        open_db_session: Callable[[], AsyncSession],
+        redis: Redis,
+        concurrency: int
+    ) -> None:
+        self.open_db_session: Callable[[], AsyncSession] = open_db_session
+        self.redis: Redis = redis
+        self.concurrency: int = concurrency
+        self.tasks: dict[int, asyncio.Task] = {}
+
+    def schedule(
+        self,
+        chat_id: int,
+        entry_data: dict[str, Any]
+    ) -> None:
+        # Over budget or already warming this chat: the click pays on a miss
+        if len(self.tasks) >= self.concurrency or chat_id in self.tasks:
+            return
+        task = asyncio.create_task(
+            self.prefetch(chat_id, entry_data["score"], entry_data["entry_id"])
+        )
+        self.tasks[chat_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(chat_id, None))
+
+    async def prefetch(
+        self,
+        chat_id: int,
+        score: int,
+        entry_id: int
+    ) -> None:
+        try:
+            async with self.open_db_session() as session:
+                db = DbAdapter(session, self.redis)
+                account = await db.snapshot(chat_id)
+                for account_id in await db.feed.neighbours(
+                    account.id,
+                    ranking.rank(score, entry_id)
+                ):
+                    await db.card(account_id)
+        except Exception:
+            logger.exception("Failed to prefetch cards for chat %s", chat_id)
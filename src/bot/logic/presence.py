@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from redis.asyncio import Redis
+from sqlalchemy import BigInteger, Text, column, update, values
+from src.core.postgres.bot.engine import open_db_session
+from src.bot.logic.snapshots import ACCOUNTS_CHANNEL, account_snapshots
+import src.core.postgres.bot as tb
+
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceWriter:
+    """Coalesces handle refreshes in memory and writes them in bulk."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        interval: float
+    ) -> None:
+        self.redis: Redis = redis
+        self.interval: float = interval
+        self.pending: dict[int, str | None] = {}
+
+    def note(
+        self,
+        chat_id: int,
+        handle: str | None
+    ) -> None:
+        self.pending[chat_id] = handle
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        rows = values(
+            column("chat_id", BigInteger),
+            column("handle", Text),
+            name="presence"
+        ).data(list(pending.items()))
+        try:
+            async with open_db_session() as session:
+                await session.execute(
+                    update(tb.Account)
+                    .where(tb.Account.chat_id == rows.c.chat_id)
+                    .values(handle=rows.c.handle)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+        except BaseException:
+            # Newer values noted in the meantime win over the failed ones
+            self.pending = pending | self.pending
+            raise
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for chat_id in pending:
+                account_snapshots.invalidate(chat_id)
+                pipe.publish(ACCOUNTS_CHANNEL, chat_id)
+            await pipe.execute()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to write presence updates")
@@ -0,0 +1,106 @@
+from typing import Iterable, Sequence
+from src.core.config import settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Keeps equal scores ordered by the tie-breaker inside one float
+SCORE_STEP = 2 ** 32
+# Below this many candidates the per-item loop beats building arrays
+VECTORIZE_FROM = 256
+
+
+def tag_mask(
+    tag_ids: Iterable[int] | None
+) -> int:
+    mask: int = 0
+    for tag_id in tag_ids or ():
+        mask |= 1 << tag_id
+    return mask
+
+
+class Ranking:
+    """Scores candidates by the weighted tags they share with a viewer."""
+
+    def __init__(
+        self,
+        weights: dict[int, int] | None = None,
+        tie_breaker: str = "oldest"
+    ) -> None:
+        self.weights: dict[int, int] = weights or {}
+        self.tie_breaker: str = tie_breaker
+
+    def weight(
+        self,
+        tag_id: int
+    ) -> int:
+        return self.weights.get(tag_id, 1)
+
+    def score(
+        self,
+        viewer_mask: int,
+        candidate_mask: int
+    ) -> int:
+        common: int = viewer_mask & candidate_mask
+        if not self.weights:
+            return common.bit_count()
+        score: int = 0
+        while common:
+            lowest: int = common & -common
+            score += self.weight(lowest.bit_length() - 1)
+            common ^= lowest
+        return score
+
+    def scores(
+        self,
+        viewer_mask: int,
+        candidate_masks: Sequence[int]
+    ) -> list[int]:
+        if np is None or len(candidate_masks) < VECTORIZE_FROM:
+            return [self.score(viewer_mask, m) for m in candidate_masks]
+        # Bits the viewer lacks never score, so the viewer sets the width
+        size: int = max((viewer_mask.bit_length() + 7) // 8, 1)
+        limit: int = (1 << size * 8) - 1
+        viewer = np.frombuffer(viewer_mask.to_bytes(size, "little"), dtype=np.uint8)
+        matrix = np.frombuffer(
+            b"".join((m & limit).to_bytes(size, "little") for m in candidate_masks),
+            dtype=np.uint8
+        ).reshape(len(candidate_masks), size)
+        common = np.unpackbits(matrix & viewer, axis=1, bitorder="little")
+        weights = np.fromiter(
+            (self.weight(i) for i in range(size * 8)),
+            dtype=np.int64,
+            count=size * 8
+        )
+        return (common @ weights).tolist()
+
+    def rank(
+        self,
+        score: int,
+        account_id: int
+    ) -> int:
+        match self.tie_breaker:
+            case "newest":
+                return score * SCORE_STEP + account_id
+            case _:
+                return score * SCORE_STEP - account_id
+
+    def score_of(
+        self,
+        rank: int,
+        account_id: int
+    ) -> int:
+        match self.tie_breaker:
+            case "newest":
+                return (rank - account_id) // SCORE_STEP
+            case _:
+                return (rank + account_id) // SCORE_STEP
+
+
+ranking = Ranking(
+    {int(k): v for k, v in settings.get("ranking.weights", {}).items()},
+    settings.get("ranking.tie_breaker", "oldest")
+)
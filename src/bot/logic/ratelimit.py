@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup, EditMessageText,
+    Response, TelegramMethod
+)
+from aiogram.methods.base import TelegramType
+
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+priority: ContextVar[int] = ContextVar("priority", default=INTERACTIVE)
+
+# Menu edits replace one message in place, so paging does not send new ones
+EDITS = (EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup, EditMessageText)
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Marks the requests made inside the block as yielding to interactive ones."""
+    token = priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: float
+    ) -> None:
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.tokens: float = capacity
+        self.updated: float = time.monotonic()
+        self.blocked_until: float = 0
+
+    def refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def delay(
+        self,
+        reserve: float = 0
+    ) -> float:
+        """Takes a token and returns 0, or returns how long to wait for one."""
+        now = self.refill()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1 + reserve:
+            self.tokens -= 1
+            return 0
+        return (1 + reserve - self.tokens) / self.rate
+
+    def blocked_for(self) -> float:
+        return max(self.blocked_until - time.monotonic(), 0)
+
+    def block(
+        self,
+        seconds: float
+    ) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiterMiddleware(BaseRequestMiddleware):
+    """Paces chat-bound API calls with a global and a per-chat token bucket."""
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        background_reserve: float = 5,
+        max_retries: int = 2,
+        max_wait: float = 5,
+        chat_ttl: float = 60
+    ) -> None:
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate: float = chat_rate
+        self.chat_burst: float = chat_burst
+        self.chat_buckets: dict[int | str, TokenBucket] = {}
+        self.background_reserve: float = background_reserve
+        self.max_retries: int = max_retries
+        # Seconds an interactive call may spend waiting in total
+        self.max_wait: float = max_wait
+        self.chat_ttl: float = chat_ttl
+        self.waiting: list[int] = [0, 0]
+        self.throttled: int = 0
+
+    def chat_bucket(
+        self,
+        chat_id: int | str
+    ) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) > 10000:
+                self.evict()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def evict(self) -> None:
+        threshold = time.monotonic() - self.chat_ttl
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if bucket.updated < threshold:
+                del self.chat_buckets[chat_id]
+
+    async def acquire(
+        self,
+        chat_id: int | str,
+        level: int,
+        method: TelegramMethod,
+        deadline: float
+    ) -> None:
+        chat_bucket = self.chat_bucket(chat_id)
+        # Edits skip the chat pacing but still honour a flood wait on the chat
+        pace = chat_bucket.blocked_for if isinstance(method, EDITS) else chat_bucket.delay
+        while wait := pace():
+            if time.monotonic() + wait > deadline:
+                # Handlers hold a database session, so they give up instead
+                raise TelegramRetryAfter(
+                    method=method,
+                    message="Chat flood limit is exceeded",
+                    retry_after=math.ceil(wait)
+                )
+            self.throttled += 1
+            await asyncio.sleep(wait)
+        # Only calls queued for the global bucket hold back the background ones
+        self.waiting[level] += 1
+        try:
+            while True:
+                if level == BACKGROUND and self.waiting[INTERACTIVE]:
+                    wait = 1 / self.global_bucket.rate
+                else:
+                    wait = self.global_bucket.delay(
+                        self.background_reserve if level == BACKGROUND else 0
+                    )
+                if not wait:
+                    break
+                self.throttled += 1
+                await asyncio.sleep(wait)
+        finally:
+            self.waiting[level] -= 1
+
+    def depth(self) -> dict[str, int]:
+        return {
+            "interactive": self.waiting[INTERACTIVE],
+            "background": self.waiting[BACKGROUND],
+            "throttled": self.throttled
+        }
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        chat_id: Any = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+        level: int = priority.get()
+        deadline: float = (
+            time.monotonic() + self.max_wait
+            if level == INTERACTIVE else float("inf")
+        )
+        attempt: int = 0
+        while True:
+            await self.acquire(chat_id, level, method, deadline)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.chat_bucket(chat_id).block(e.retry_after)
+                logger.warning("Flood wait of %ss for chat %s", e.retry_after, chat_id)
+                # Background senders reschedule their work themselves
+                if (
+                    level == BACKGROUND
+                    or attempt >= self.max_retries
+                    or time.monotonic() + e.retry_after > deadline
+                ):
+                    raise
+                attempt += 1
+
+
+async def report_queue_depth(
+    limiter: RateLimiterMiddleware,
+    interval: float
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        depth = limiter.depth()
+        limiter.throttled = 0
+        logger.info(
+            "Requests waiting interactive=%d background=%d throttled=%d",
+            depth["interactive"],
+            depth["background"],
+            depth["throttled"]
+        )
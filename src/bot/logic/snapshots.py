@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from src.core.config import settings
+
+
+ACCOUNTS_CHANNEL = "accounts:invalidate"
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    id: int
+    chat_id: int
+    type: str
+    is_active: bool
+    handle: str | None
+    full_name: str
+    tag_ids: frozenset[int]
+    liked_ids: frozenset[int]
+
+
+class SnapshotCache:
+    """Bounded in-process LRU of account snapshots keyed by chat id."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float
+    ) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.entries: OrderedDict[int, tuple[float, AccountSnapshot]] = OrderedDict()
+        # Bumped by every invalidation, so loads that raced one are not stored
+        self.generation: int = 0
+
+    def get(
+        self,
+        chat_id: int
+    ) -> AccountSnapshot | None:
+        entry = self.entries.get(chat_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[chat_id]
+            return None
+        self.entries.move_to_end(chat_id)
+        return entry[1]
+
+    def put(
+        self,
+        snapshot: AccountSnapshot,
+        generation: int
+    ) -> None:
+        if generation != self.generation:
+            return
+        self.entries[snapshot.chat_id] = (time.monotonic() + self.ttl, snapshot)
+        self.entries.move_to_end(snapshot.chat_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(
+        self,
+        chat_id: int | bytes
+    ) -> None:
+        self.generation += 1
+        self.entries.pop(int(chat_id), None)
+
+
+account_snapshots = SnapshotCache(
+    settings.get("snapshots.maxsize", 10000),
+    settings.get("snapshots.ttl", 60)
+)
@@ -0,0 +1,182 @@
+import json
+import logging
+from typing import Any, Mapping
+
+import ormsgpack
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+
+
+logger = logging.getLogger(__name__)
+
+CONVERT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("SET", KEYS[1], ARGV[2], "KEEPTTL")
+end
+return false
+"""
+
+
+def is_json(
+    value: bytes
+) -> bool:
+    # A msgpack map never starts with "{", which is a positive fixint there
+    return value[:1] == b"{"
+
+
+class MsgpackRedisStorage(RedisStorage):
+    """Redis FSM storage that keeps state data as msgpack, reading old JSON too."""
+
+    async def set_data(
+        self,
+        key: StorageKey,
+        data: Mapping[str, Any]
+    ) -> None:
+        redis_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(redis_key)
+            return
+        await self.redis.set(
+            redis_key,
+            ormsgpack.packb(data),
+            ex=self.data_ttl
+        )
+
+    @staticmethod
+    def decode(
+        value: bytes | None
+    ) -> dict[str, Any]:
+        if value is None:
+            return {}
+        if is_json(value):
+            return json.loads(value)
+        return ormsgpack.unpackb(value)
+
+    async def get_data(
+        self,
+        key: StorageKey
+    ) -> dict[str, Any]:
+        return self.decode(
+            await self.redis.get(
+                self.key_builder.build(key, "data")
+            )
+        )
+
+    async def load(
+        self,
+        key: StorageKey
+    ) -> tuple[str | None, dict[str, Any]]:
+        """Reads the state and the data in one round trip."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self.key_builder.build(key, "state"))
+            pipe.get(self.key_builder.build(key, "data"))
+            state, data = await pipe.execute()
+        if isinstance(state, bytes):
+            state = state.decode()
+        return state, self.decode(data)
+
+    async def save(
+        self,
+        key: StorageKey,
+        **record: Any
+    ) -> None:
+        """Writes the "state" and "data" present in the record in one transaction."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if "state" in record:
+                state_key = self.key_builder.build(key, "state")
+                if record["state"] is None:
+                    pipe.delete(state_key)
+                else:
+                    pipe.set(state_key, record["state"], ex=self.state_ttl)
+            if "data" in record:
+                data_key = self.key_builder.build(key, "data")
+                if not record["data"]:
+                    pipe.delete(data_key)
+                else:
+                    pipe.set(data_key, ormsgpack.packb(record["data"]), ex=self.data_ttl)
+            await pipe.execute()
+
+    async def migrate(
+        self,
+        marker: str = "fsm:msgpack"
+    ) -> None:
+        """Converts the JSON data records once per Redis database."""
+        if not await self.redis.set(marker, 1, nx=True):
+            return
+        convert = self.redis.register_script(CONVERT)
+        converted: int = 0
+        pattern: str = f"{self.key_builder.prefix}{self.key_builder.separator}*data"
+        async for redis_key in self.redis.scan_iter(match=pattern, count=1000):
+            value = await self.redis.get(redis_key)
+            if value is None or not is_json(value):
+                continue
+            # Skipped if a handler rewrote the record in the meantime
+            if await convert(
+                keys=[redis_key],
+                args=[value, ormsgpack.packb(json.loads(value))]
+            ):
+                converted += 1
+        logger.info("Converted %d FSM data records to msgpack", converted)
+
+
+class BufferedFSMContext(FSMContext):
+    """FSM context that serves one snapshot and writes the changes back once."""
+
+    storage: MsgpackRedisStorage
+
+    def __init__(
+        self,
+        storage: MsgpackRedisStorage,
+        key: StorageKey
+    ) -> None:
+        super().__init__(storage, key)
+        self.state: str | None = None
+        self.data: dict[str, Any] = {}
+        self.changes: dict[str, Any] = {}
+
+    async def load(self) -> None:
+        self.state, self.data = await self.storage.load(self.key)
+
+    async def flush(self) -> None:
+        if self.changes:
+            await self.storage.save(self.key, **self.changes)
+            self.changes = {}
+
+    async def set_state(
+        self,
+        state: StateType = None
+    ) -> None:
+        self.state = state.state if isinstance(state, State) else state
+        self.changes["state"] = self.state
+
+    async def get_state(self) -> str | None:
+        return self.state
+
+    async def set_data(
+        self,
+        data: Mapping[str, Any]
+    ) -> None:
+        self.data = dict(data)
+        self.changes["data"] = self.data
+
+    async def get_data(self) -> dict[str, Any]:
+        return dict(self.data)
+
+    async def get_value(
+        self,
+        key: str,
+        default: Any | None = None
+    ) -> Any | None:
+        return self.data.get(key, default)
+
+    async def update_data(
+        self,
+        data: Mapping[str, Any] | None = None,
+        **kwargs: Any
+    ) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        await self.set_data({**self.data, **kwargs})
+        return dict(self.data)
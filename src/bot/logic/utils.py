@@ -1,4 +1,54 @@
+from typing import Any
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.types import FSInputFile, InlineKeyboardMarkup, InputMediaPhoto, Message
 from aiogram.utils.i18n import I18n
+from src.bot.logic.entities import media
 
 
 i18n = I18n(path="src/bot/locales")
+
+
+async def edit_menu(
+    bot: Bot,
+    chat_id: int,
+    state: FSMContext,
+    state_data: dict[str, Any],
+    text: str,
+    markup: InlineKeyboardMarkup,
+    file: str | FSInputFile | None = None
+) -> None:
+    """Edits the menu message, replacing its photo only when it differs."""
+    try:
+        if file is None or file == state_data.get("menu_media"):
+            await bot.edit_message_caption(
+                chat_id=chat_id,
+                message_id=state_data["menu_message_id"],
+                caption=text,
+                reply_markup=markup
+            )
+            return
+        answer: Message | bool = await bot.edit_message_media(
+            chat_id=chat_id,
+            message_id=state_data["menu_message_id"],
+            media=InputMediaPhoto(
+                media=file,
+                caption=text
+            ),
+            reply_markup=markup
+        )
+    except TelegramBadRequest as e:
+        # Re-rendering the screen that is already shown changes nothing
+        if "message is not modified" in e.message:
+            return
+        raise
+    await media.remember(file, answer)
+    if isinstance(file, FSInputFile):
+        file = answer.photo[-1].file_id if isinstance(answer, Message) else None
+    state_data["menu_media"] = file
+    await state.update_data(
+        {
+            "menu_media": file
+        }
+    )
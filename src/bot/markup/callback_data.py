@@ -21,6 +21,14 @@ class PaginatedEntryAction(CallbackData, prefix="page"):
     page: int
 
 
+class CursorMenuAction(CallbackData, prefix="cursor"):
+    action: str
+    # "first", "next", "prev" or "at"
+    direction: str
+    score: int
+    entry_id: int
+
+
 class TypedEntryAction(CallbackData, prefix="tentry"):
     action: str
     entry_id: int
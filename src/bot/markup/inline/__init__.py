@@ -1,3 +1,5 @@
+from aiogram.utils.i18n import I18n
+from src.bot.logic.states import Dialogue
 from src.bot.markup.inline.account import (
     main_menu, account_menu, account_list, account_tag_list, registration_menu
 )
@@ -5,3 +7,16 @@ from src.bot.markup.inline.misc import (
     popup, account_link
 )
 from src.bot.markup.inline.dialogue import question
+
+
+def warm_up(
+    i18n: I18n
+) -> None:
+    """Renders every static keyboard for every available locale."""
+    for locale in i18n.available_locales:
+        main_menu(i18n, locale)
+        account_menu(i18n, locale)
+        registration_menu(i18n, locale)
+        popup(i18n, locale)
+        for state in Dialogue.__states__:
+            question(state, i18n, locale)
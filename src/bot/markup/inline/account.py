@@ -1,46 +1,73 @@
+from functools import cache, lru_cache
 from typing import Iterable
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.i18n import I18n
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-import src.core.postgres.bot as tb
+from src.bot.logic.catalogue import TagEntry
 from src.bot.markup.callback_data import (
-    CallbackData, MenuAction, EntryAction,
-    DataAction, PaginatedMenuAction, PaginatedEntryAction
+    MenuAction, EntryAction,
+    DataAction, CursorMenuAction
 )
 
 
-def paginated_menu_builder(
+SHOW_MAIN_MENU: str = MenuAction(action="show_main_menu").pack()
+SHOW_ACCOUNT_MENU: str = MenuAction(action="show_account_menu").pack()
+
+
+@lru_cache(maxsize=4096)
+def entry_data(
+    action: str,
+    entry_id: int
+) -> str:
+    return EntryAction(
+        action=action,
+        entry_id=entry_id
+    ).pack()
+
+
+def cursor_data(
     action: str,
-    action_entry_id: int | None,
-    back_action: CallbackData,
-    page: int,
-    last_page: int,
+    direction: str,
+    score: int,
+    entry_id: int
+) -> str:
+    return CursorMenuAction(
+        action=action,
+        direction=direction,
+        score=score,
+        entry_id=entry_id
+    ).pack()
+
+
+def cursor_menu_builder(
+    action: str,
+    back_action: str,
+    score: int,
+    entry_id: int,
+    has_prev: bool,
+    has_next: bool,
     i18n: I18n,
     locale: str
 ) -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
-    if page > 0:
+    if has_prev:
         builder.button(
             text="<",
-            callback_data=PaginatedEntryAction(
-                action=action,
-                entry_id=action_entry_id,
-                page=page-1
-            ) if action_entry_id is not None else PaginatedMenuAction(
-                action=action,
-                page=page-1
+            callback_data=cursor_data(
+                action,
+                "prev",
+                score,
+                entry_id
             )
         )
-    if page < last_page:
+    if has_next:
         builder.button(
             text=">",
-            callback_data=PaginatedEntryAction(
-                action=action,
-                entry_id=action_entry_id,
-                page=page+1
-            ) if action_entry_id is not None else PaginatedMenuAction(
-                action=action,
-                page=page+1
+            callback_data=cursor_data(
+                action,
+                "next",
+                score,
+                entry_id
             )
         )
     builder.row(
@@ -49,12 +76,13 @@ def paginated_menu_builder(
                 "general.button.back",
                 locale=locale
             ),
-            callback_data=back_action.pack()
+            callback_data=back_action
         )
     )
     return builder
 
 
+@cache
 def main_menu(
     i18n: I18n,
     locale: str
@@ -66,10 +94,12 @@ def main_menu(
                 "main_menu.button.browse",
                 locale=locale
             ),
-            callback_data=PaginatedMenuAction(
-                action="show_account_list",
-                page=0
-            ).pack()
+            callback_data=cursor_data(
+                "show_account_list",
+                "first",
+                0,
+                0
+            )
         )
     )
     builder.row(
@@ -86,6 +116,7 @@ def main_menu(
     return builder.as_markup()
 
 
+@cache
 def account_menu(
     i18n: I18n,
     locale: str
@@ -150,37 +181,38 @@ def account_menu(
 
 
 def account_list(
-    account: tb.Account,
-    accounts: Iterable[tb.Account],
-    page: int,
+    target_account_id: int,
+    is_liked: bool,
+    score: int,
+    has_prev: bool,
+    has_next: bool,
     i18n: I18n,
     locale: str
 ) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    target_account: tb.Account = accounts[page]
     builder.row(
         InlineKeyboardButton(
             text=i18n.gettext(
                 "account_list.button.unlike",
                 locale=locale
-            ) if target_account.id in [l.liked_account_id for l in account.likes] else i18n.gettext(
+            ) if is_liked else i18n.gettext(
                 "account_list.button.like",
+                locale=locale
             ),
-            callback_data=EntryAction(
-                action="toggle_account_like",
-                entry_id=target_account.id
-            ).pack()
+            callback_data=entry_data(
+                "toggle_account_like",
+                target_account_id
+            )
         )
     )
     builder.attach(
-        paginated_menu_builder(
+        cursor_menu_builder(
             "show_account_list",
-            None,
-            MenuAction(
-                action="show_main_menu"
-            ),
-            page,
-            len(accounts) - 1,
+            SHOW_MAIN_MENU,
+            score,
+            target_account_id,
+            has_prev,
+            has_next,
             i18n,
             locale
         )
@@ -189,23 +221,23 @@ def account_list(
 
 
 def account_tag_list(
-    tags: Iterable[tb.Tag],
-    account_tags: Iterable[tb.AccountTag],
+    tags: Iterable[TagEntry],
+    tag_ids: Iterable[int],
     i18n: I18n,
     locale: str
 ) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for tag in tags:
         prefix = ""
-        if tag.id in [at.tag.id for at in account_tags]:
+        if tag.id in tag_ids:
             prefix = "✅ "
         builder.row(
             InlineKeyboardButton(
                 text=prefix + tag.title,
-                callback_data=EntryAction(
-                    action="toggle_account_tag",
-                    entry_id=tag.id
-                ).pack()
+                callback_data=entry_data(
+                    "toggle_account_tag",
+                    tag.id
+                )
             )
         )
     builder.row(
@@ -214,23 +246,20 @@ def account_tag_list(
                 "general.button.back",
                 locale=locale
             ),
-            callback_data=MenuAction(
-                action="show_account_menu"
-            ).pack()
+            callback_data=SHOW_ACCOUNT_MENU
         ),
         InlineKeyboardButton(
             text=i18n.gettext(
                 "general.button.home",
                 locale=locale
             ),
-            callback_data=MenuAction(
-                action="show_main_menu"
-            ).pack()
+            callback_data=SHOW_MAIN_MENU
         )
     )
     return builder.as_markup()
 
 
+@cache
 def registration_menu(
     i18n: I18n,
     locale: str
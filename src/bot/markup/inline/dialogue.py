@@ -1,3 +1,4 @@
+from functools import cache
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.i18n import I18n
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -5,6 +6,7 @@ from src.bot.logic.states import State, Dialogue
 from src.bot.markup.callback_data import MenuAction
 
 
+@cache
 def question(
     state: State,
     i18n: I18n,
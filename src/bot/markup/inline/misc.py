@@ -1,9 +1,11 @@
+from functools import cache
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.i18n import I18n
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from src.bot.markup.callback_data import MenuAction
 
 
+@cache
 def popup(
     i18n: I18n,
     locale: str
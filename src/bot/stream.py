@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import nats
+from nats.aio.client import Client
+from nats.aio.msg import Msg
+from nats.errors import TimeoutError
+from nats.js import JetStreamContext
+from nats.js.api import ConsumerConfig
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from pydantic import ValidationError
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateStream:
+    """Raw updates on a JetStream subject partitioned by chat id.
+
+    Every partition is a durable pull consumer shared by all workers with at
+    most one unacknowledged message, so updates of a chat are handled in
+    order by one worker at a time while partitions spread across workers.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        stream: str,
+        subject: str,
+        partitions: int,
+        ack_wait: float
+    ) -> None:
+        self.url: str = url
+        self.stream: str = stream
+        self.subject: str = subject
+        self.partitions: int = partitions
+        self.ack_wait: float = ack_wait
+        self.client: Client | None = None
+        self.js: JetStreamContext | None = None
+
+    async def connect(self) -> None:
+        self.client = await nats.connect(self.url)
+        self.js = self.client.jetstream()
+        await self.js.add_stream(
+            name=self.stream,
+            subjects=[f"{self.subject}.*"]
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.drain()
+
+    def partition_subject(
+        self,
+        chat_id: int
+    ) -> str:
+        return f"{self.subject}.{chat_id % self.partitions}"
+
+    async def publish(
+        self,
+        update: Update,
+        chat_id: int
+    ) -> None:
+        await self.js.publish(
+            self.partition_subject(chat_id),
+            update.model_dump_json(
+                by_alias=True,
+                exclude_none=True
+            ).encode()
+        )
+
+    async def consume(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        stop: asyncio.Event
+    ) -> None:
+        await asyncio.gather(
+            *(
+                self.consume_partition(dispatcher, bot, partition, stop)
+                for partition in range(self.partitions)
+            )
+        )
+
+    async def consume_partition(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        partition: int,
+        stop: asyncio.Event
+    ) -> None:
+        subscription = await self.js.pull_subscribe(
+            f"{self.subject}.{partition}",
+            durable=f"{self.stream}-{partition}",
+            stream=self.stream,
+            config=ConsumerConfig(
+                max_ack_pending=1,
+                ack_wait=self.ack_wait
+            )
+        )
+        while not stop.is_set():
+            try:
+                messages = await subscription.fetch(1, timeout=5)
+            except TimeoutError:
+                continue
+            for message in messages:
+                heartbeat = asyncio.create_task(self.keep_alive(message))
+                try:
+                    await self.handle(dispatcher, bot, message)
+                finally:
+                    heartbeat.cancel()
+
+    async def keep_alive(
+        self,
+        message: Msg
+    ) -> None:
+        """Extends the ack deadline while the update is still being handled."""
+        while True:
+            await asyncio.sleep(self.ack_wait / 2)
+            try:
+                await message.in_progress()
+            except Exception as e:
+                logger.warning("Failed to extend the ack deadline: %r", e)
+
+    async def handle(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        message: Msg
+    ) -> None:
+        try:
+            update = Update.model_validate_json(
+                message.data,
+                context={"bot": bot}
+            )
+        except ValidationError:
+            logger.exception("Dropped a malformed update")
+            await message.term()
+            return
+        try:
+            await dispatcher.feed_update(bot, update)
+        except Exception:
+            # Handlers are not idempotent, so a failed update is dropped for
+            # good instead of being redelivered, same as with polling
+            logger.exception("Failed to process update %d", update.update_id)
+            await message.term()
+            return
+        await message.ack()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import signal
+from typing import Any, Awaitable, Callable, Iterable
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from src.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Raises when a dependency of the replica is unavailable
+ReadinessCheck = Callable[[], Awaitable[Any]]
+
+
+async def healthz(
+    request: web.Request
+) -> web.Response:
+    return web.Response(text="ok")
+
+
+async def readyz(
+    request: web.Request
+) -> web.Response:
+    if request.app["stopping"].is_set():
+        return web.Response(status=503, text="stopping")
+    try:
+        for check in request.app["checks"]:
+            await check()
+    except Exception as e:
+        logger.warning("Readiness check failed: %r", e)
+        return web.Response(status=503, text="unavailable")
+    return web.Response(text="ok")
+
+
+def create_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    checks: Iterable[ReadinessCheck],
+    secret_token: str | None = None
+) -> web.Application:
+    app = web.Application()
+    app["stopping"] = asyncio.Event()
+    app["checks"] = list(checks)
+    # Updates are handled inside the request, so draining the server on
+    # shutdown also waits for the handlers that are still running
+    SimpleRequestHandler(
+        dispatcher,
+        bot,
+        handle_in_background=False,
+        secret_token=secret_token
+    ).register(app, path=settings.webhook.path)
+    setup_application(app, dispatcher, bot=bot)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    return app
+
+
+async def serve(
+    app: web.Application,
+    runner: web.AppRunner,
+    grace_period: float
+) -> None:
+    """Waits for SIGTERM or SIGINT, then fails readiness and drains the server."""
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, app["stopping"].set)
+    await app["stopping"].wait()
+    # The load balancer takes the replica out of rotation meanwhile,
+    # requests that still arrive are served as usual
+    await asyncio.sleep(grace_period)
+    await runner.cleanup()
+
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    checks: Iterable[ReadinessCheck]
+) -> None:
+    """Serves updates over a webhook until SIGTERM or SIGINT arrives."""
+    app = create_app(
+        dispatcher,
+        bot,
+        checks,
+        settings.bot.get("webhook_secret") or None
+    )
+    runner = web.AppRunner(
+        app,
+        shutdown_timeout=settings.webhook.shutdown_timeout,
+        handle_signals=False
+    )
+    await runner.setup()
+    await web.TCPSite(
+        runner,
+        settings.webhook.host,
+        settings.webhook.port
+    ).start()
+    # Every replica registers the same load-balanced URL, which is idempotent
+    await bot.set_webhook(
+        settings.webhook.url + settings.webhook.path,
+        secret_token=settings.bot.get("webhook_secret") or None,
+        max_connections=settings.webhook.max_connections,
+        allowed_updates=dispatcher.resolve_used_update_types()
+    )
+    await serve(
+        app,
+        runner,
+        settings.webhook.get("grace_period", 5)
+    )
@@ -0,0 +1,36 @@
+import hashlib
+import os
+from pathlib import Path
+from src.core.config import settings
+
+
+class BlobStore:
+    """Content-addressed on-disk file storage."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> bytes | None:
+        path = self.path(digest)
+        if path.exists():
+            return path.read_bytes()
+        return None
+
+
+blob_store: BlobStore | None = (
+    BlobStore(settings.media.blob_dir)
+    if settings.get("media.blob_dir") else None
+)
@@ -1,8 +1,99 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.core.config import settings
 
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolUsage:
+    size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    wait_total: float
+    wait_max: float
+
+
+class GaugedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts: int = 0
+        self.wait_total: float = 0
+        self.wait_max: float = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def usage(self, reset: bool = False) -> PoolUsage:
+        usage = PoolUsage(
+            self.size(),
+            self.checkedout(),
+            max(self.overflow(), 0),
+            self.checkouts,
+            self.wait_total,
+            self.wait_max
+        )
+        if reset:
+            self.checkouts = 0
+            self.wait_total = 0
+            self.wait_max = 0
+        return usage
+
+
 engine: AsyncEngine = create_async_engine(
-    f"postgresql+asyncpg://{settings.postgres.username}:{settings.postgres.password}@{settings.postgres.host}:{settings.postgres.port}/{settings.postgres.database}", future=True
+    f"postgresql+asyncpg://{settings.postgres.username}:{settings.postgres.password}@{settings.postgres.host}:{settings.postgres.port}/{settings.postgres.database}", future=True,
+    poolclass=GaugedQueuePool,
+    pool_size=settings.get("postgres_pool.size", 5),
+    max_overflow=settings.get("postgres_pool.max_overflow", 10),
+    pool_timeout=settings.get("postgres_pool.timeout", 30),
+    pool_recycle=settings.get("postgres_pool.recycle", -1),
+    pool_pre_ping=settings.get("postgres_pool.pre_ping", False),
+    connect_args={
+        "prepared_statement_cache_size": settings.get("postgres_pool.statement_cache_size", 100),
+        "server_settings": {
+            "statement_timeout": str(settings.get("postgres_pool.statement_timeout", 0))
+        }
+    }
 )
 open_db_session = async_sessionmaker(engine)
+
+
+async def ping() -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+def pool_usage(reset: bool = False) -> PoolUsage:
+    return engine.pool.usage(reset)
+
+
+async def report_pool_usage(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        usage = pool_usage(reset=True)
+        logger.info(
+            "Pool size=%d checked_out=%d overflow=%d checkouts=%d "
+            "wait_avg=%.4fs wait_max=%.4fs",
+            usage.size,
+            usage.checked_out,
+            usage.overflow,
+            usage.checkouts,
+            usage.wait_total / usage.checkouts if usage.checkouts else 0,
+            usage.wait_max
+        )
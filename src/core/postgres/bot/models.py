@@ -1,21 +1,35 @@
 from sqlalchemy import (
-    Column, Text, Boolean, Integer, ForeignKey, BigInteger, LargeBinary
+    Column, Text, Boolean, Integer, ForeignKey, BigInteger, LargeBinary,
+    UniqueConstraint, Index, text
 )
 from src.core.postgres.wrapper import Base
-from sqlalchemy.orm import relationship, mapped_column
+from sqlalchemy.orm import relationship, mapped_column, deferred
 
 
 class Account(Base):
     """Represents user account."""
 
+    __table_args__ = (
+        Index("ix_account_type_is_active", "type", "is_active"),
+        Index(
+            "ix_account_active_mentor",
+            "id",
+            postgresql_where=text("type = 'mentor' AND is_active")
+        ),
+    )
+
     type = Column(Text, nullable=False)
 
     is_active = Column(Boolean, default=True, nullable=False)
     chat_id = Column(BigInteger, unique=True, nullable=False)
     handle = Column(Text, nullable=True)
     full_name = Column(Text, nullable=False)
-    description = Column(Text, nullable=True)
-    image = Column(LargeBinary, nullable=True)
+    description = deferred(Column(Text, nullable=True), raiseload=True)
+    image = deferred(Column(LargeBinary, nullable=True), raiseload=True)
+    image_file_id = Column(Text, nullable=True)
+    image_file_unique_id = Column(Text, nullable=True)
+    # sha256 of the image bytes, known only when they were downloaded
+    image_hash = Column(Text, nullable=True)
 
     account_tags = relationship(
         "AccountTag", back_populates="account"
@@ -35,6 +49,13 @@ class Account(Base):
 class Like(Base):
     """Represents user account like."""
 
+    __table_args__ = (
+        UniqueConstraint(
+            "liker_account_id", "liked_account_id", name="uq_like_liker_liked"
+        ),
+        Index("ix_like_liked_liker", "liked_account_id", "liker_account_id"),
+    )
+
     liker_account_id = Column(Integer, ForeignKey("account.id"), nullable=False)
     liked_account_id = Column(Integer, ForeignKey("account.id"), nullable=False)
 
@@ -55,6 +76,13 @@ class Like(Base):
 class AccountTag(Base):
     """Represents account-tag relationship."""
 
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id", "tag_id", name="uq_accounttag_account_tag"
+        ),
+        Index("ix_accounttag_tag_account", "tag_id", "account_id"),
+    )
+
     account_id = Column(Integer, ForeignKey("account.id"))
     tag_id = Column(Integer, ForeignKey("tag.id"))
 
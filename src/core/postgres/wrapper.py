@@ -1,7 +1,10 @@
 from typing import Iterable
 from sqlalchemy import ScalarResult, select, TIMESTAMP, Integer
 from sqlalchemy.sql.functions import now
-from sqlalchemy.orm import joinedload, mapped_column
+from sqlalchemy.orm import (
+    joinedload, selectinload, subqueryload, raiseload, mapped_column,
+    load_only as only, defer as deferred, undefer as undeferred
+)
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.declarative import declared_attr, as_declarative
 
@@ -28,6 +31,33 @@ class Base:
     )
 
 
+LOADERS = {
+    "joined": joinedload,
+    "selectin": selectinload,
+    "subquery": subqueryload,
+    "raise": raiseload
+}
+
+
+def loader_chain(path: Iterable):
+    """Builds loader options for a relationship path.
+
+    A strategy name in the path applies to the relationships after it,
+    the first one defaults to "joined".
+    """
+    option = None
+    strategy: str = "joined"
+    for step in path:
+        if isinstance(step, str):
+            strategy = step
+            continue
+        if option is None:
+            option = LOADERS[strategy](step)
+        else:
+            option = getattr(option, LOADERS[strategy].__name__)(step)
+    return option
+
+
 class DbWrapper:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -50,6 +80,9 @@ class DbWrapper:
         *args,
         select_from: Iterable | None = None,
         join: Iterable | None = None,
+        load_only: Iterable | None = None,
+        defer: Iterable | None = None,
+        undefer: Iterable | None = None,
         exists: bool = False,
         order_by: Iterable | None = None,
         limit: int | None = None,
@@ -59,12 +92,13 @@ class DbWrapper:
         if select_from:
             stmt = stmt.select_from(*select_from)
         if join:
-            js: list = []
-            for i in join:
-                js.append(joinedload(i[0]))
-                for j in i[1:]:
-                    js[-1] = js[-1].joinedload(j)
-            stmt = stmt.options(*js)
+            stmt = stmt.options(*(loader_chain(i) for i in join))
+        if load_only:
+            stmt = stmt.options(only(*load_only, raiseload=True))
+        if defer:
+            stmt = stmt.options(*(deferred(i, raiseload=True) for i in defer))
+        if undefer:
+            stmt = stmt.options(*(undeferred(i) for i in undefer))
         if exists:
             stmt = stmt.exists()
         for arg in args:
@@ -0,0 +1,53 @@
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+
+class FakeTelegram:
+    """Bot API stand-in that records calls and rejects edits that change nothing."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.messages: dict[tuple[str, str], dict[str, str]] = {}
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.method)
+        self.server = TestServer(app)
+
+    async def method(
+        self,
+        request: web.Request
+    ) -> web.Response:
+        name: str = request.match_info["method"]
+        params: dict[str, str] = {k: str(v) for k, v in (await request.post()).items()}
+        self.calls.append(name)
+        if name.startswith("editMessage"):
+            key = (params.pop("chat_id", ""), params.pop("message_id", ""))
+            if self.messages.get(key) == params:
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 400,
+                        "description": "Bad Request: message is not modified: specified new "
+                                       "message content and reply markup are exactly the same "
+                                       "as a current content and reply markup of the message"
+                    },
+                    status=400
+                )
+            self.messages[key] = params
+        return web.json_response({"ok": True, "result": True})
+
+    async def start(self) -> Bot:
+        await self.server.start_server()
+        return Bot(
+            "42:TEST",
+            session=AiohttpSession(
+                api=TelegramAPIServer.from_base(
+                    f"http://{self.server.host}:{self.server.port}"
+                )
+            )
+        )
+
+    async def close(self) -> None:
+        await self.server.close()
@@ -0,0 +1,67 @@
+import os
+import unittest
+from unittest import mock
+
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from fake_telegram import FakeTelegram
+
+# The bot package builds its clients on import, none of them connects here
+for name, value in {
+    "DYNACONF_BOT__TOKEN": "42:TEST",
+    "DYNACONF_REDIS__HOST": "localhost",
+    "DYNACONF_REDIS__PORT": "6379",
+    "DYNACONF_REDIS__DATABASE": "1",
+    "DYNACONF_POSTGRES__HOST": "localhost",
+    "DYNACONF_POSTGRES__PORT": "5432",
+    "DYNACONF_POSTGRES__USERNAME": "test",
+    "DYNACONF_POSTGRES__PASSWORD": "test",
+    "DYNACONF_POSTGRES__DATABASE": "test"
+}.items():
+    os.environ.setdefault(name, value)
+
+from src.bot.logic.utils import edit_menu  # noqa: E402
+
+
+MARKUP = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text=">", callback_data="next")]
+    ]
+)
+
+
+class EditMenuTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.telegram = FakeTelegram()
+        self.bot = await self.telegram.start()
+        self.state = mock.AsyncMock(spec=FSMContext)
+        self.state_data = {"menu_message_id": 5}
+
+    async def asyncTearDown(self) -> None:
+        await self.bot.session.close()
+        await self.telegram.close()
+
+    async def test_same_caption_twice(self) -> None:
+        for _ in range(2):
+            await edit_menu(self.bot, 7, self.state, self.state_data, "Main menu", MARKUP)
+        self.assertEqual(self.telegram.calls, ["editMessageCaption", "editMessageCaption"])
+
+    async def test_same_photo_twice(self) -> None:
+        for _ in range(2):
+            await edit_menu(self.bot, 7, self.state, self.state_data, "Profile", MARKUP, "photo-id")
+        self.assertEqual(self.telegram.calls, ["editMessageMedia", "editMessageCaption"])
+        self.assertEqual(self.state_data["menu_media"], "photo-id")
+
+    async def test_changed_caption_is_sent(self) -> None:
+        await edit_menu(self.bot, 7, self.state, self.state_data, "Main menu", MARKUP)
+        await edit_menu(self.bot, 7, self.state, self.state_data, "Tags", MARKUP)
+        self.assertEqual(
+            [params["caption"] for params in self.telegram.messages.values()],
+            ["Tags"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
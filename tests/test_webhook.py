@@ -0,0 +1,132 @@
+import asyncio
+import os
+import signal
+import unittest
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+
+from fake_telegram import FakeTelegram
+from src.bot.webhook import create_app, serve
+from src.core.config import settings
+
+
+SECRET = "test-secret"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 7, "type": "private"},
+        "from": {"id": 7, "is_bot": False, "first_name": "Test"},
+        "text": "hello"
+    }
+}
+
+
+async def fail() -> None:
+    raise ConnectionError("unavailable")
+
+
+class WebhookTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.telegram = FakeTelegram()
+        self.calls: list[str] = self.telegram.calls
+        self.bot = await self.telegram.start()
+        self.entered = asyncio.Event()
+        self.release = asyncio.Event()
+        self.handled: list[int] = []
+        dispatcher = Dispatcher()
+
+        @dispatcher.message()
+        async def echo(
+            message: Message,
+            bot: Bot
+        ) -> None:
+            self.entered.set()
+            await self.release.wait()
+            await bot.send_chat_action(message.chat.id, "typing")
+            self.handled.append(message.message_id)
+
+        self.app = create_app(dispatcher, self.bot, [], SECRET)
+        self.runner = web.AppRunner(self.app, shutdown_timeout=5, handle_signals=False)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        self.base = f"http://{host}:{port}"
+        self.client = aiohttp.ClientSession()
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+        await self.bot.session.close()
+        await self.telegram.close()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(signum)
+
+    async def post_update(
+        self,
+        secret: str | None = SECRET
+    ) -> aiohttp.ClientResponse:
+        headers = {}
+        if secret is not None:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+        async with self.client.post(
+            self.base + settings.webhook.path,
+            json=UPDATE,
+            headers=headers
+        ) as response:
+            await response.read()
+            return response
+
+    async def test_rejects_missing_or_wrong_secret(self) -> None:
+        self.release.set()
+        self.assertEqual((await self.post_update(None)).status, 401)
+        self.assertEqual((await self.post_update("wrong")).status, 401)
+        self.assertEqual(self.handled, [])
+        self.assertEqual((await self.post_update()).status, 200)
+        self.assertEqual(self.handled, [1])
+        self.assertEqual(self.calls, ["sendChatAction"])
+
+    async def test_healthz(self) -> None:
+        async with self.client.get(self.base + "/healthz") as response:
+            self.assertEqual(response.status, 200)
+
+    async def test_readyz_follows_checks(self) -> None:
+        async with self.client.get(self.base + "/readyz") as response:
+            self.assertEqual(response.status, 200)
+        self.app["checks"].append(fail)
+        async with self.client.get(self.base + "/readyz") as response:
+            self.assertEqual(response.status, 503)
+
+    async def test_sigterm_fails_readiness_then_drains(self) -> None:
+        serving = asyncio.create_task(serve(self.app, self.runner, 0.3))
+        in_flight = asyncio.create_task(self.post_update())
+        await self.entered.wait()
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(self.app["stopping"].wait(), 1)
+        # Still serving during the grace period, but out of rotation
+        async with self.client.get(self.base + "/readyz") as response:
+            self.assertEqual(response.status, 503)
+        async with self.client.get(self.base + "/healthz") as response:
+            self.assertEqual(response.status, 200)
+        await asyncio.sleep(0.4)
+        self.assertFalse(serving.done())
+        # The update that arrived before SIGTERM finishes before shutdown
+        self.release.set()
+        self.assertEqual((await in_flight).status, 200)
+        await serving
+        self.assertEqual(self.handled, [1])
+        self.assertEqual(self.calls, ["sendChatAction"])
+        with self.assertRaises(aiohttp.ClientConnectionError):
+            async with self.client.get(self.base + "/healthz"):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()